@@ -6,33 +6,87 @@ class Preset:
         # set sensitve defaults
         self.road_width = 1
         self.primitives = []
+        self.chunks = []
 
-def eval(root):
+class Chunk:
+    """Primitives expanded from one preset element that can be redrawn on its
+    own, e.g. a single select or one leaf inside a repeat"""
+    def __init__(self, element, primitives, sampling):
+        self.element = element
+        self.primitives = primitives
+        self.sampling = sampling
+
+    def resample(self):
+        return Chunk(self.element, eval_element(self.element, self.sampling),
+            self.sampling)
+
+def get_sampling(root, max_chord_error=None, max_segment_length=None):
+    """Sampling tolerances of the preset, arguments that are not None
+    override the values of the preset"""
+    attrib = root.getroot().attrib
+    sampling = primitive.Sampling()
+    if max_chord_error is not None:
+        sampling.max_chord_error = max_chord_error
+    elif "maxChordError" in attrib:
+        sampling.max_chord_error = float(attrib["maxChordError"])
+    if max_segment_length is not None:
+        sampling.max_segment_length = max_segment_length
+    elif "maxSegmentLength" in attrib:
+        sampling.max_segment_length = float(attrib["maxSegmentLength"])
+    # zero would ask for infinitely many segments
+    if not (sampling.max_chord_error > 0 and sampling.max_segment_length > 0):
+        raise ValueError("sampling tolerances must be greater than 0: {}".format(sampling))
+    return sampling
+
+def eval(root, sampling=None):
+    if sampling is None:
+        sampling = get_sampling(root)
     preset = Preset()
     preset.road_width = 0.4 # TODO
-    preset.primitives = eval_element(root.find("sequence"))
+    preset.chunks = eval_chunks(root.find("sequence"), sampling)
+    preset.primitives = [x for chunk in preset.chunks for x in chunk.primitives]
     return preset
 
-def eval_element(el):
+def eval_chunks(el, sampling):
+    if el.tag == "sequence":
+        return [x for child in el for x in eval_chunks(child, sampling)]
+    elif el.tag == "repeat":
+        n = repeat_count(el)
+        return [x for _ in range(n) for child in el
+            for x in eval_chunks(child, sampling)]
+    else:
+        return [Chunk(el, eval_element(el, sampling), sampling)]
+
+def repeat_count(el):
+    if "min" in el.attrib and "max" in el.attrib:
+        return random.randint(int(el.attrib["min"]), int(el.attrib["max"]))
+    else:
+        return int(el.attrib["n"])
+
+def eval_element(el, sampling):
     if el.tag == "line":
         return [
             primitive.StraightLine(el.attrib)
         ]
     elif el.tag == "leftArc":
         return [
-            primitive.LeftCircularArc(el.attrib)
+            primitive.LeftCircularArc(el.attrib, sampling)
         ]
     elif el.tag == "rightArc":
         return [
-            primitive.RightCircularArc(el.attrib)
+            primitive.RightCircularArc(el.attrib, sampling)
         ]
     elif el.tag == "quadBezier":
         return [
-            primitive.QuadBezier(el.attrib)
+            primitive.QuadBezier(el.attrib, sampling)
         ]
     elif el.tag == "cubicBezier":
         return [
-            primitive.CubicBezier(el.attrib)
+            primitive.CubicBezier(el.attrib, sampling)
+        ]
+    elif el.tag == "clothoid":
+        return [
+            primitive.Clothoid(el.attrib, sampling)
         ]
     elif el.tag == "blockedArea":
         return [
@@ -63,18 +117,15 @@ def eval_element(el):
             primitive.ParkingObstacle(el.attrib)
         ]
     elif el.tag == "sequence":
-        return [x for child in el for x in eval_element(child)]
+        return [x for child in el for x in eval_element(child, sampling)]
     elif el.tag == "optional":
         if random.random() < float(el.attrib["p"]):
-            return [x for child in el for x in eval_element(child)]
+            return [x for child in el for x in eval_element(child, sampling)]
         else:
             return []
     elif el.tag == "repeat":
-        if "min" in el.attrib and "max" in el.attrib:
-            n = random.randint(int(el.attrib["min"]), int(el.attrib["max"]))
-        else:
-            n = int(el.attrib["n"])
-        return [x for _ in range(n) for child in el for x in eval_element(child)]
+        n = repeat_count(el)
+        return [x for _ in range(n) for child in el for x in eval_element(child, sampling)]
     elif el.tag == "select":
         total = sum([float(case.attrib["w"]) for case in el])
         target = random.random() * total
@@ -82,11 +133,11 @@ def eval_element(el):
         for case in el:
             current_total += float(case.attrib["w"])
             if target < current_total:
-                return [x for child in case for x in eval_element(child)]
+                return [x for child in case for x in eval_element(child, sampling)]
                 break
     elif el.tag == "shuffle":
         children = list(el)
         random.shuffle(children)
-        return [x for child in children for x in eval_element(child)]
+        return [x for child in children for x in eval_element(child, sampling)]
     else:
         return []
@@ -1,12 +1,71 @@
 import numpy as np
 import math
 from shapely.geometry import LineString, CAP_STYLE, JOIN_STYLE
-import scipy.integrate as integrate
-from commonroad import schema
+from shapely import affinity
+import scipy.special as special
+import collections
+from commonroad import scenario
+
+# number of dense samples used to estimate length and curvature of Béziers
+BEZIER_DENSE_STEPS = 256
+# derivatives of Béziers below this length count as zero
+BEZIER_EPSILON = 1e-12
+# number of dense samples per block of a FresnelTable
+CLOTHOID_DENSE_STEPS = 256
+# range of the Fresnel parameter l sampled at once by a FresnelTable
+FRESNEL_BLOCK = 0.5
+# number of A and sampling pairs kept in FRESNEL_TABLES
+FRESNEL_TABLE_SIZE = 64
+# number of distinct primitive geometries kept in TEMPLATE_CACHE
+TEMPLATE_CACHE_SIZE = 256
 
 class MissingPointsException(Exception):
     pass
 
+class Sampling:
+    """Tolerances for turning curved primitives into polylines"""
+    def __init__(self, max_chord_error=0.001, max_segment_length=0.1):
+        # maximum distance between a segment and the exact curve
+        self.max_chord_error = max_chord_error
+        # maximum length of a segment, even on straight parts
+        self.max_segment_length = max_segment_length
+
+    def __repr__(self):
+        return "Sampling(max_chord_error={}, max_segment_length={})".format(
+            self.max_chord_error, self.max_segment_length)
+
+    def __eq__(self, other):
+        return (isinstance(other, Sampling)
+            and self.max_chord_error == other.max_chord_error
+            and self.max_segment_length == other.max_segment_length)
+
+    def __hash__(self):
+        return hash((self.max_chord_error, self.max_segment_length))
+
+    def step_length(self, curvature):
+        # chord error of a segment with length l is about curvature * l^2 / 8
+        curvature = np.abs(curvature)
+        with np.errstate(divide="ignore"):
+            step = np.sqrt(8 * self.max_chord_error / curvature)
+        return np.minimum(step, self.max_segment_length)
+
+    def arc_steps(self, radius, angle):
+        segments = math.ceil(radius * angle / self.step_length(1 / radius))
+        # at least three points, get_beginning and get_ending fit a circle
+        return max(segments, 2) + 1
+
+    def parameters(self, t, length, curvature):
+        """Distribute parameter values along a curve given by dense samples of
+        its parameter t, the arc length and the curvature at t"""
+        density = 1 / self.step_length(curvature)
+        # number of segments needed up to each dense sample
+        needed = np.concatenate(([0], np.cumsum(
+            np.diff(length) * (density[1:] + density[:-1]) / 2)))
+        segments = max(math.ceil(needed[-1]), 2)
+        return np.interp(np.linspace(0, needed[-1], segments + 1), needed, t)
+
+DEFAULT_SAMPLING = Sampling()
+
 def circle_from_points(x1, y1, x2, y2, x3, y3):
     s1 = np.array([[y2 - y1], [- (x2 - x1)]])
     s2 = np.array([[y3 - y2], [- (x3 - x2)]])
@@ -25,7 +84,7 @@ def circle_from_points(x1, y1, x2, y2, x3, y3):
 def is_left(a, b, c):
     x = b - a
     y = c - a
-    return np.cross(x, y) > 0
+    return x[0] * y[1] - x[1] * y[0] > 0
 
 def convert_line_marking(marking):
     if marking is None or marking == "missing":
@@ -33,16 +92,104 @@ def convert_line_marking(marking):
     else:
         return marking
 
+def unit_arc(angles):
+    return np.column_stack((np.cos(angles), np.sin(angles)))
+
+def offset_boundaries(points, distance):
+    """Polylines left and right of points at the given distance"""
+    points = np.asarray(points, dtype=float)
+    direction = np.diff(points, axis=0)
+    normal = np.column_stack((-direction[:, 1], direction[:, 0]))
+    normal /= np.linalg.norm(normal, axis=1)[:, np.newaxis]
+    # the last point has no segment of its own, use the one in front of it
+    offset = np.vstack((normal, normal[-1:])) * distance
+    return (points + offset, points - offset)
+
 class Export:
     def __init__(self, objects, lanelet_pairs):
         self.objects = objects
         self.lanelet_pairs = lanelet_pairs
 
+class Template:
+    """Geometry of a primitive in its local frame. Every field is computed
+    on first use."""
+    def __init__(self, points):
+        self.points = points
+        self.beginning = None
+        self.ending = None
+        # keyed by road width
+        self.corridors = {}
+        self.boundaries = {}
+
+class TemplateCache:
+    """Least recently used templates keyed by primitive parameters"""
+    def __init__(self, max_size=TEMPLATE_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._templates = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._templates)
+
+    def __repr__(self):
+        return "TemplateCache(size={}, hits={}, misses={})".format(
+            len(self), self.hits, self.misses)
+
+    def get(self, key, generate):
+        if key in self._templates:
+            self.hits += 1
+            self._templates.move_to_end(key)
+            return self._templates[key]
+        self.misses += 1
+        template = generate()
+        self._templates[key] = template
+        while len(self._templates) > self.max_size:
+            self._templates.popitem(last=False)
+        return template
+
+    def clear(self):
+        self._templates.clear()
+        self.hits = 0
+        self.misses = 0
+
+TEMPLATE_CACHE = TemplateCache()
+
 class Primitive:
+    def _template_key(self):
+        # primitives with the same key share their template, None disables it
+        return None
+
+    def _get_template(self):
+        # get_points() is called over and over again by get_beginning,
+        # get_ending, get_bounding_box and export, so generate only once
+        if not hasattr(self, "_template"):
+            key = self._template_key()
+            if key is None:
+                self._template = self._generate_template()
+            else:
+                self._template = TEMPLATE_CACHE.get(key, self._generate_template)
+        return self._template
+
+    def _generate_template(self):
+        points = np.asarray(self._generate_points(), dtype=float)
+        # templates are shared, nobody may change them
+        points.flags.writeable = False
+        return Template(points)
+
     def get_points(self):
-        return []
+        return self._get_template().points
+
+    def _generate_points(self):
+        return np.zeros((0, 2))
 
     def get_bounding_box(self, street_width):
+        corridors = self._get_template().corridors
+        if street_width not in corridors:
+            corridors[street_width] = self._generate_bounding_box(street_width)
+        return corridors[street_width]
+
+    def _generate_bounding_box(self, street_width):
         points = self.get_points()
         if len(points) == 0:
             raise MissingPointsException("get_points() returned empty array")
@@ -50,65 +197,69 @@ class Primitive:
         polygon = line.buffer(street_width, cap_style=CAP_STYLE.flat, join_style=JOIN_STYLE.round)
         return polygon
 
+    def get_boundaries(self, road_width):
+        """Left and right boundary of the road around get_points()"""
+        boundaries = self._get_template().boundaries
+        if road_width not in boundaries:
+            (left, right) = offset_boundaries(self.get_points(), road_width)
+            left.flags.writeable = False
+            right.flags.writeable = False
+            boundaries[road_width] = (left, right)
+        return boundaries[road_width]
+
     def get_beginning(self):
+        template = self._get_template()
+        if template.beginning is None:
+            template.beginning = self._generate_beginning()
+        return template.beginning
+
+    def _generate_beginning(self):
         points = self.get_points()
         p1 = np.array(points[0])
         p2 = np.array(points[1])
         dir = p1 - p2
-        circle_mid, radius = circle_from_points(points[0][0], points[0][1],
+        circle = circle_from_points(points[0][0], points[0][1],
             points[1][0], points[1][1], points[2][0], points[2][1])
+        if circle is None: # straight
+            return (p1, math.atan2(dir[1], dir[0]), 0)
+        circle_mid, radius = circle
         if not is_left(np.array(points[1]), np.array(points[0]), circle_mid.reshape(2)):
             radius = - radius # rechtskrümmung
         return (p1, math.atan2(dir[1], dir[0]), 1 / radius)
 
     def get_ending(self):
+        template = self._get_template()
+        if template.ending is None:
+            template.ending = self._generate_ending()
+        return template.ending
+
+    def _generate_ending(self):
         points = self.get_points()
         p1 = np.array(points[-1])
         p2 = np.array(points[-2])
         dir = p1 - p2
-        circle_mid, radius = circle_from_points(points[-1][0], points[-1][1],
+        circle = circle_from_points(points[-1][0], points[-1][1],
             points[-2][0], points[-2][1], points[-3][0], points[-3][1])
+        if circle is None: # straight
+            return (p1, math.atan2(dir[1], dir[0]), 0)
+        circle_mid, radius = circle
         if not is_left(np.array(points[-2]), np.array(points[-1]), circle_mid.reshape(2)):
             radius = - radius # rechtskrümmung
         return (p1, math.atan2(dir[1], dir[0]), 1 / radius)
 
     def export(self, config):
         points = self.get_points()
-        lanelet1 = schema.lanelet(leftBoundary=schema.boundary(), rightBoundary=schema.boundary())
-        lanelet2 = schema.lanelet(leftBoundary=schema.boundary(), rightBoundary=schema.boundary())
+        (left, right) = self.get_boundaries(config.road_width)
+
+        # left lanelet is reversed to match its driving direction
+        lanelet1 = scenario.Lanelet(
+            scenario.Boundary(points, convert_line_marking(self._middle_line if hasattr(self, "_middle_line") else None)),
+            scenario.Boundary(right, convert_line_marking(self._right_line if hasattr(self, "_right_line") else None)))
+        lanelet2 = scenario.Lanelet(
+            scenario.Boundary(points[::-1]),
+            scenario.Boundary(left[::-1], convert_line_marking(self._left_line if hasattr(self, "_left_line") else None)))
         if hasattr(self, "_is_start") and self._is_start:
-            lanelet1.isStart = True
-
-        lanelet1.rightBoundary.lineMarking = convert_line_marking(self._right_line if hasattr(self, "_right_line") else None)
-        lanelet1.leftBoundary.lineMarking = convert_line_marking(self._middle_line if hasattr(self, "_middle_line") else None)
-        lanelet2.rightBoundary.lineMarking = convert_line_marking(self._left_line if hasattr(self, "_left_line") else None)
-
-        for i in range(len(points)):
-            if i != len(points) - 1:
-                p1 = np.array(points[i])
-                p2 = np.array(points[i+1])
-                ortho_left = np.array([-(p2[1] - p1[1]), p2[0] - p1[0]])
-                ortho_left = ortho_left / np.linalg.norm(ortho_left) * config.road_width
-                ortho_right = ortho_left * (-1)
-            else:
-                p1 = np.array(points[i])
-
-            left = p1 + ortho_left
-            right = p1 + ortho_right
-
-            lanelet1.leftBoundary.point.append(
-                schema.point(x=points[i][0], y=points[i][1]))
-            lanelet1.rightBoundary.point.append(
-                schema.point(x=right[0], y=right[1]))
-            lanelet2.leftBoundary.point.append(
-                schema.point(x=points[i][0], y=points[i][1]))
-            lanelet2.rightBoundary.point.append(
-                schema.point(x=left[0], y=left[1]))
-        # TODO add last point
-
-        # reverse boundary of left lanelet to match driving direction
-        lanelet2.leftBoundary.point.reverse()
-        lanelet2.rightBoundary.point.reverse()
+            lanelet1.is_start = True
 
         return Export([lanelet1, lanelet2], [(lanelet1, lanelet2)])
 
@@ -117,30 +268,45 @@ class TransrotPrimitive(Primitive):
         self._child = child
         self._angle = angle
         self._translation = translation
+        self._matrix = None
 
     def __repr__(self):
         return "TransrotPrimitive(translation={}, angle={}, child={})".format(
             self._translation, self._angle, self._child)
 
     def _get_matrix(self):
-        cos = math.cos(self._angle)
-        sin = math.sin(self._angle)
-        begin = self._child.get_beginning()
-        return np.array([
-            [cos, -sin, self._translation[0] + begin[0][0]],
-            [sin, cos, self._translation[1] + begin[0][1]],
-            [0, 0, 1]
-        ]).dot(np.array([
-            [1, 0, -begin[0][0]],
-            [0, 1, -begin[0][1]],
-            [0, 0, 1]
-        ]))
+        if self._matrix is None:
+            cos = math.cos(self._angle)
+            sin = math.sin(self._angle)
+            begin = self._child.get_beginning()
+            self._matrix = np.array([
+                [cos, -sin, self._translation[0] + begin[0][0]],
+                [sin, cos, self._translation[1] + begin[0][1]],
+                [0, 0, 1]
+            ]).dot(np.array([
+                [1, 0, -begin[0][0]],
+                [0, 1, -begin[0][1]],
+                [0, 0, 1]
+            ]))
+        return self._matrix
+
+    def _transform_points(self, points):
+        matrix = self._get_matrix()
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        return points.dot(matrix[0:2, 0:2].T) + matrix[0:2, 2]
 
     def _transform_point(self, point):
-        return (self._get_matrix().dot(np.append(point, 1)))[0:2]
+        return self._transform_points(point)[0]
 
-    def get_points(self):
-        return list(map(self._transform_point, self._child.get_points()))
+    def _generate_points(self):
+        return self._transform_points(self._child.get_points())
+
+    def _generate_bounding_box(self, street_width):
+        # moving the child's corridor is much cheaper than buffering again
+        matrix = self._get_matrix()
+        return affinity.affine_transform(self._child.get_bounding_box(street_width),
+            [matrix[0, 0], matrix[0, 1], matrix[1, 0], matrix[1, 1],
+            matrix[0, 2], matrix[1, 2]])
 
     def get_beginning(self):
         begin = self._child.get_beginning()
@@ -152,35 +318,20 @@ class TransrotPrimitive(Primitive):
 
     def export(self, config):
         export = self._child.export(config)
-        objects = export.objects
-
-        for obj in objects:
-            if isinstance(obj, schema.lanelet):
-                for i in range(len(obj.leftBoundary.point)):
-                    x = obj.leftBoundary.point[i].x
-                    y = obj.leftBoundary.point[i].y
-                    transformed = self._transform_point([x, y])
-                    obj.leftBoundary.point[i].x = transformed[0]
-                    obj.leftBoundary.point[i].y = transformed[1]
-                for i in range(len(obj.rightBoundary.point)):
-                    x = obj.rightBoundary.point[i].x
-                    y = obj.rightBoundary.point[i].y
-                    transformed = self._transform_point([x, y])
-                    obj.rightBoundary.point[i].x = transformed[0]
-                    obj.rightBoundary.point[i].y = transformed[1]
-            elif isinstance(obj, schema.obstacle):
-                for rect in obj.shape.rectangle:
-                    x = rect.centerPoint.x
-                    y = rect.centerPoint.y
-                    transformed = self._transform_point([x, y])
+
+        # arrays may be shared with templates, replace them instead of
+        # changing them in place
+        for obj in export.objects:
+            if isinstance(obj, scenario.Lanelet):
+                obj.left_boundary.points = self._transform_points(obj.left_boundary.points)
+                obj.right_boundary.points = self._transform_points(obj.right_boundary.points)
+            elif isinstance(obj, scenario.Obstacle):
+                for rect in obj.shape.rectangles:
                     rect.orientation -= self._angle
-                    rect.centerPoint = schema.point(x=transformed[0], y=transformed[1])
-            elif isinstance(obj, schema.trafficSign):
-                x = obj.centerPoint.x
-                y = obj.centerPoint.y
-                transformed = self._transform_point([x, y])
+                    rect.center = self._transform_point(rect.center)
+            elif isinstance(obj, scenario.TrafficSign):
                 obj.orientation += self._angle
-                obj.centerPoint = schema.point(x=transformed[0], y=transformed[1])
+                obj.center = self._transform_point(obj.center)
 
         return export
 
@@ -195,8 +346,11 @@ class StraightLine(Primitive):
     def __repr__(self):
         return "StraightLine(length={})".format(self._length)
 
-    def get_points(self):
-        return [[0, 0], [self._length, 0]]
+    def _template_key(self):
+        return ("line", self._length)
+
+    def _generate_points(self):
+        return np.array([[0, 0], [self._length, 0]], dtype=float)
 
     def get_beginning(self):
         return (np.array([0, 0]), math.pi, 0)
@@ -205,7 +359,8 @@ class StraightLine(Primitive):
         return (np.array([self._length, 0]), 0, 0)
 
 class LeftCircularArc(Primitive):
-    def __init__(self, args):
+    def __init__(self, args, sampling=DEFAULT_SAMPLING):
+        self._sampling = sampling
         self._radius = float(args["radius"])
         self._angle = math.radians(float(args["angle"]))
         self._left_line = args.get("leftLine", "solid")
@@ -215,16 +370,16 @@ class LeftCircularArc(Primitive):
     def __repr__(self):
         return "LeftCircularArc(radius={}, angle={})".format(self._radius, self._angle)
 
-    def get_points(self):
-        points = []
-        current_angle = 0
-        while current_angle <= self._angle:
-            points.append([
-                math.cos(current_angle - math.pi/2) * self._radius,
-                self._radius + math.sin(current_angle - math.pi/2) * self._radius
-            ])
-            current_angle += 0.01 # TODO what else
-        return points
+    def _template_key(self):
+        return ("leftArc", self._radius, self._angle, self._sampling)
+
+    def _generate_points(self):
+        angles = np.linspace(0, self._angle,
+            self._sampling.arc_steps(self._radius, self._angle))
+        return np.column_stack((
+            np.cos(angles - math.pi/2) * self._radius,
+            self._radius + np.sin(angles - math.pi/2) * self._radius
+        ))
 
     def get_beginning(self):
         return (np.array([0, 0]), math.pi, 1 / self._radius)
@@ -236,7 +391,8 @@ class LeftCircularArc(Primitive):
         ]), self._angle, - 1 / self._radius)
 
 class RightCircularArc(Primitive):
-    def __init__(self, args):
+    def __init__(self, args, sampling=DEFAULT_SAMPLING):
+        self._sampling = sampling
         self._radius = float(args["radius"])
         self._angle = math.radians(float(args["angle"]))
         self._left_line = args.get("leftLine", "solid")
@@ -246,16 +402,16 @@ class RightCircularArc(Primitive):
     def __repr__(self):
         return "RightCircularArc(radius={}, angle={})".format(self._radius, self._angle)
 
-    def get_points(self):
-        points = []
-        current_angle = 0
-        while current_angle <= self._angle:
-            points.append([
-                math.cos(math.pi/2 - current_angle) * self._radius,
-                - self._radius + math.sin(math.pi/2 - current_angle) * self._radius
-            ])
-            current_angle += 0.01 # TODO what else
-        return points
+    def _template_key(self):
+        return ("rightArc", self._radius, self._angle, self._sampling)
+
+    def _generate_points(self):
+        angles = np.linspace(0, self._angle,
+            self._sampling.arc_steps(self._radius, self._angle))
+        return np.column_stack((
+            np.cos(math.pi/2 - angles) * self._radius,
+            - self._radius + np.sin(math.pi/2 - angles) * self._radius
+        ))
 
     def get_beginning(self):
         return (np.array([0, 0]), math.pi, - 1 / self._radius)
@@ -266,8 +422,65 @@ class RightCircularArc(Primitive):
             - self._radius + math.sin(math.pi/2 - self._angle) * self._radius
         ]), - self._angle, 1 / self._radius)
 
-class QuadBezier(Primitive):
-    def __init__(self, args):
+class Bezier(Primitive):
+    def _curvature(self, t):
+        """Signed curvature at t, positive values turn left"""
+        d1 = self._derivative(t)
+        d2 = self._second_derivative(t)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.nan_to_num((d1[:,0] * d2[:,1] - d1[:,1] * d2[:,0])
+                / np.linalg.norm(d1, axis=1)**3)
+
+    def _generate_points(self):
+        t = np.linspace(0, 1, BEZIER_DENSE_STEPS + 1)
+        dense = self._evaluate(t)
+        length = np.concatenate(([0], np.cumsum(
+            np.linalg.norm(np.diff(dense, axis=0), axis=1))))
+        return self._evaluate(self._sampling.parameters(t, length,
+            self._curvature(t)))
+
+    def _is_regular(self, t):
+        return np.linalg.norm(self._derivative(np.array([t]))[0]) > BEZIER_EPSILON
+
+    def _tangent(self, t):
+        """Driving direction at t=0 or t=1, taken from the next derivative
+        where the first one vanishes. None if the curve is a single point."""
+        derivatives = (self._derivative, self._second_derivative,
+            self._third_derivative)
+        for (order, derivative) in enumerate(derivatives):
+            dir = derivative(np.array([t]))[0]
+            if np.linalg.norm(dir) > BEZIER_EPSILON:
+                # coming from t<1 the even derivatives point backwards
+                return dir if t == 0 or order % 2 == 0 else - dir
+        return None
+
+    def _generate_beginning(self):
+        dir = self._tangent(0.0)
+        if dir is None:
+            return super()._generate_beginning()
+        if self._is_regular(0.0):
+            curvature = float(- self._curvature(np.array([0.0]))[0])
+        else:
+            # no finite limit at a cusp, fit a circle to the points instead
+            curvature = float(super()._generate_beginning()[2])
+        # seen against driving direction like Primitive.get_beginning
+        return (self._evaluate(np.array([0.0]))[0],
+            math.atan2(- dir[1], - dir[0]), curvature)
+
+    def _generate_ending(self):
+        dir = self._tangent(1.0)
+        if dir is None:
+            return super()._generate_ending()
+        if self._is_regular(1.0):
+            curvature = float(self._curvature(np.array([1.0]))[0])
+        else:
+            curvature = float(super()._generate_ending()[2])
+        return (self._evaluate(np.array([1.0]))[0],
+            math.atan2(dir[1], dir[0]), curvature)
+
+class QuadBezier(Bezier):
+    def __init__(self, args, sampling=DEFAULT_SAMPLING):
+        self._sampling = sampling
         self._p0 = np.array([0, 0])
         self._p1 = np.array([float(args["p1x"]), float(args["p1y"])])
         self._p2 = np.array([float(args["p2x"]), float(args["p2y"])])
@@ -275,20 +488,30 @@ class QuadBezier(Primitive):
         self._middle_line = args.get("middleLine", "dashed")
         self._right_line = args.get("rightLine", "solid")
 
-        self._points = []
-        t = 0
-        while t <= 1:
-            c0 = (1-t) * self._p0 + t * self._p1
-            c1 = (1-t) * self._p1 + t * self._p2
-            x = (1-t) * c0 + t * c1
-            self._points.append(x)
-            t += 0.01
+    def __repr__(self):
+        return "QuadBezier(p1={}, p2={})".format(self._p1, self._p2)
 
-    def get_points(self):
-        return self._points
+    def _template_key(self):
+        return ("quadBezier", tuple(self._p1), tuple(self._p2), self._sampling)
 
-class CubicBezier(Primitive):
-    def __init__(self, args):
+    def _evaluate(self, t):
+        t = np.asarray(t)[:, np.newaxis]
+        return ((1-t)**2 * self._p0 + 2 * (1-t) * t * self._p1
+            + t**2 * self._p2)
+
+    def _derivative(self, t):
+        t = np.asarray(t)[:, np.newaxis]
+        return 2 * (1-t) * (self._p1 - self._p0) + 2 * t * (self._p2 - self._p1)
+
+    def _second_derivative(self, t):
+        return np.tile(2 * (self._p2 - 2 * self._p1 + self._p0), (len(t), 1))
+
+    def _third_derivative(self, t):
+        return np.zeros((len(t), 2))
+
+class CubicBezier(Bezier):
+    def __init__(self, args, sampling=DEFAULT_SAMPLING):
+        self._sampling = sampling
         self._p0 = np.array([0, 0])
         self._p1 = np.array([float(args["p1x"]), float(args["p1y"])])
         self._p2 = np.array([float(args["p2x"]), float(args["p2y"])])
@@ -297,77 +520,176 @@ class CubicBezier(Primitive):
         self._middle_line = args.get("middleLine", "dashed")
         self._right_line = args.get("rightLine", "solid")
 
-        self._points = []
-        t = 0
-        while t <= 1:
-            c0 = (1-t) * self._p0 + t * self._p1
-            c1 = (1-t) * self._p1 + t * self._p2
-            c2 = (1-t) * self._p2 + t * self._p3
-            d0 = (1-t) * c0 + t * c1
-            d1 = (1-t) * c1 + t * c2
-            x = (1-t) * d0 + t * d1
-            self._points.append(x)
-            t += 0.01
+    def __repr__(self):
+        return "CubicBezier(p1={}, p2={}, p3={})".format(self._p1, self._p2, self._p3)
+
+    def _template_key(self):
+        return ("cubicBezier", tuple(self._p1), tuple(self._p2), tuple(self._p3),
+            self._sampling)
 
-    def get_points(self):
-        return self._points
+    def _evaluate(self, t):
+        t = np.asarray(t)[:, np.newaxis]
+        return ((1-t)**3 * self._p0 + 3 * (1-t)**2 * t * self._p1
+            + 3 * (1-t) * t**2 * self._p2 + t**3 * self._p3)
+
+    def _derivative(self, t):
+        t = np.asarray(t)[:, np.newaxis]
+        return (3 * (1-t)**2 * (self._p1 - self._p0)
+            + 6 * (1-t) * t * (self._p2 - self._p1)
+            + 3 * t**2 * (self._p3 - self._p2))
+
+    def _second_derivative(self, t):
+        t = np.asarray(t)[:, np.newaxis]
+        return (6 * (1-t) * (self._p2 - 2 * self._p1 + self._p0)
+            + 6 * t * (self._p3 - 2 * self._p2 + self._p1))
+
+    def _third_derivative(self, t):
+        return np.tile(6 * (self._p3 - 3 * self._p2 + 3 * self._p1 - self._p0),
+            (len(t), 1))
 
 def euler_spiral(l, A):
-    factor = A * math.sqrt(math.pi)
-    return [factor * integrate.quad(lambda t: math.cos(math.pi * t * t / 2), 0, l)[0],
-        factor * integrate.quad(lambda t: math.sin(math.pi * t * t / 2), 0, l)[0]]
+    (s, c) = special.fresnel(l)
+    return A * math.sqrt(math.pi) * np.stack((c, s), axis=-1)
+
+def spiral_parameters(a, l_begin, l_end, sampling):
+    """Fresnel parameters of the euler spiral from l_begin to l_end"""
+    l = np.linspace(l_begin, l_end, CLOTHOID_DENSE_STEPS + 1)
+    length = l * a * math.sqrt(math.pi)
+    curvature = math.sqrt(math.pi) * l / a
+    return sampling.parameters(l, length, curvature)
+
+class FresnelTable:
+    """Points of the euler spiral with parameter A for l >= 0. The table
+    grows in blocks of FRESNEL_BLOCK, each sampled on its own, so the points
+    up to some l do not depend on how far the table reached before."""
+    def __init__(self, a, sampling):
+        self.a = a
+        self.sampling = sampling
+        self.l = np.zeros(1)
+        self.points = np.zeros((1, 2))
+        self._blocks = 0
+
+    def __repr__(self):
+        return "FresnelTable(a={}, sampling={}, l_max={})".format(
+            self.a, self.sampling, self.l[-1])
+
+    def _extend(self, l_end):
+        parameters = []
+        while self._blocks * FRESNEL_BLOCK < l_end:
+            parameters.append(spiral_parameters(self.a,
+                self._blocks * FRESNEL_BLOCK,
+                (self._blocks + 1) * FRESNEL_BLOCK, self.sampling)[1:])
+            self._blocks += 1
+        l = np.concatenate(parameters)
+        self.l = np.concatenate((self.l, l))
+        self.points = np.concatenate((self.points, euler_spiral(l, self.a)))
+
+    def part(self, l_end):
+        """Points of the euler spiral from l=0 to l=l_end"""
+        l_max = abs(l_end)
+        if self.l[-1] < l_max:
+            self._extend(l_max)
+        inner = np.searchsorted(self.l, l_max)
+        points = np.concatenate((self.points[:inner],
+            euler_spiral(np.array([l_max]), self.a)))
+        # both fresnel integrals are odd
+        return points if l_end >= 0 else - points
+
+FRESNEL_TABLES = TemplateCache(FRESNEL_TABLE_SIZE)
+
+def clothoid_points(a, curvature_begin, curvature_end, max_chord_error,
+        max_segment_length, tables=FRESNEL_TABLES):
+    """Points of a clothoid, tables=None samples the spiral without keeping
+    a FresnelTable"""
+    sampling = Sampling(max_chord_error, max_segment_length)
+    if tables is None:
+        table = FresnelTable(a, sampling)
+    else:
+        table = tables.get((a, sampling), lambda: FresnelTable(a, sampling))
+    len_begin = math.fabs(curvature_begin) * a / math.sqrt(math.pi)
+    len_end = math.fabs(curvature_end) * a / math.sqrt(math.pi)
+
+    parts = []
+    if len_begin > 0:
+        begin_points = table.part(-len_begin)[::-1]
+        if curvature_begin > 0: # nach links drehen
+            begin_points[:, 1] *= -1 # -> y-achse spiegeln
+        parts.append(begin_points)
+    if len_end > 0:
+        end_points = table.part(len_end)
+        if curvature_end < 0:
+            end_points[:, 1] *= -1
+        # both parts share the inflection point at the origin
+        parts.append(end_points[1:] if len(parts) > 0 else end_points)
+    return np.concatenate(parts) if len(parts) > 0 else np.zeros((0, 2))
 
 class Clothoid(Primitive):
-    def __init__(self, curvature_begin, curvature_end, a):
-        self._curv_begin = curvature_begin
-        self._curv_end = curvature_end
-        self._a = a # clothoid parameter A
-
-        len_begin = math.fabs(curvature_begin) * a / math.sqrt(math.pi)
-        len_end = math.fabs(curvature_end) * a / math.sqrt(math.pi)
-
-        begin_points = []
-        for l in np.arange(-len_begin, 0, 0.01):
-            p = euler_spiral(l, a)
-            if curvature_begin < 0: # nach rechts drehen
-                p[1] = - p[1] # -> y-achse spiegeln
-            begin_points.append(p)
-        end_points = []
-        for l in np.arange(0, len_end, 0.01):
-            p = euler_spiral(l, a)
-            if curvature_end < 0:
-                p[1] = - p[1]
-            end_points.append(p)
-        self._points = begin_points + end_points
-        if len(self._points) < 2:
-            #print(curvature_begin, curvature_end, a)
-            pass
+    """Curvature changes linearly from curvatureBegin to zero and then to
+    curvatureEnd. Curvatures are signed in driving direction, positive
+    values turn left. Spiral points come from FRESNEL_TABLES unless
+    fresnel_tables is None."""
+    def __init__(self, args, sampling=DEFAULT_SAMPLING,
+            fresnel_tables=FRESNEL_TABLES):
+        self._sampling = sampling
+        self._fresnel_tables = fresnel_tables
+        self._curv_begin = float(args["curvatureBegin"])
+        self._curv_end = float(args["curvatureEnd"])
+        self._a = float(args["a"]) # clothoid parameter A
+        # the schema only ensures a > 0, without curvature there is no spiral
+        if self._curv_begin == 0 and self._curv_end == 0:
+            raise ValueError("clothoid needs curvatureBegin or curvatureEnd "
+                "other than 0")
+        self._left_line = args.get("leftLine", "solid")
+        self._middle_line = args.get("middleLine", "dashed")
+        self._right_line = args.get("rightLine", "solid")
 
-    def get_points(self):
-        return self._points
+    def __repr__(self):
+        return "Clothoid(curvature_begin={}, curvature_end={}, a={})".format(
+            self._curv_begin, self._curv_end, self._a)
+
+    def _template_key(self):
+        return ("clothoid", self._a, self._curv_begin, self._curv_end,
+            self._sampling)
+
+    def _generate_points(self):
+        return clothoid_points(self._a, self._curv_begin, self._curv_end,
+            self._sampling.max_chord_error, self._sampling.max_segment_length,
+            self._fresnel_tables)
+
+    def _tangent_angle(self, curvature):
+        # tangent angle of the euler spiral at the point with this curvature
+        l = curvature * self._a / math.sqrt(math.pi)
+        return math.pi * l * l / 2
 
     def get_beginning(self):
-        dir = np.array(self._points[0]) - np.array(self._points[1])
-        return (np.array(self._points[0]), math.atan2(dir[1], dir[0]), self._curv_begin)
+        angle = self._tangent_angle(self._curv_begin)
+        if self._curv_begin > 0:
+            angle = - angle
+        # curvature is seen against driving direction like in Primitive
+        return (self.get_points()[0], angle + math.pi, - self._curv_begin)
 
     def get_ending(self):
-        dir = np.array(self._points[-1]) - np.array(self._points[-2])
-        return (np.array(self._points[-1]), math.atan2(dir[1], dir[0]), self._curv_end)
+        angle = self._tangent_angle(self._curv_end)
+        if self._curv_end < 0:
+            angle = - angle
+        return (self.get_points()[-1], angle, self._curv_end)
 
 class Intersection(Primitive):
     def __init__(self, args):
         self._size = 0.9 # TODO
         self._target_dir = args["turn"]
         self._rule = args["rule"]
+
+    def _template_key(self):
+        return ("intersection", self._size, self._target_dir)
+
+    def _generate_points(self):
         if self._target_dir == "left":
-            self._points = [[0, -self._size], [0, 0], [-self._size, 0]]
+            return [[0, -self._size], [0, 0], [-self._size, 0]]
         elif self._target_dir == "right":
-            self._points = [[0, -self._size], [0, 0], [self._size, 0]]
+            return [[0, -self._size], [0, 0], [self._size, 0]]
         elif self._target_dir == "straight":
-            self._points = [[0, -self._size], [0, 0], [0, self._size]]
-
-    def get_points(self):
-        return self._points
+            return [[0, -self._size], [0, 0], [0, self._size]]
 
     def get_beginning(self):
         return (np.array([0, -self._size]), 1.5 * math.pi, 0)
@@ -381,143 +703,94 @@ class Intersection(Primitive):
             return (np.array([0, self._size]), 0.5 * math.pi, 0)
 
     def export(self, config):
-        southRight = schema.lanelet(leftBoundary=schema.boundary(), rightBoundary=schema.boundary())
-        southRight.leftBoundary.lineMarking = "dashed"
-        southRight.rightBoundary.lineMarking = "solid"
-        southRight.leftBoundary.point.append(schema.point(x=0, y=-self._size))
-        southRight.leftBoundary.point.append(schema.point(x=0, y=-config.road_width))
-        southRight.rightBoundary.point.append(schema.point(x=config.road_width, y=-self._size))
-        southRight.rightBoundary.point.append(schema.point(x=config.road_width, y=-config.road_width))
-
-        southLeft = schema.lanelet(leftBoundary=schema.boundary(), rightBoundary=schema.boundary())
-        southLeft.rightBoundary.lineMarking = "solid"
-        southLeft.leftBoundary.point.append(schema.point(x=0, y=-config.road_width))
-        southLeft.leftBoundary.point.append(schema.point(x=0, y=-self._size))
-        southLeft.rightBoundary.point.append(schema.point(x=-config.road_width, y=-config.road_width))
-        southLeft.rightBoundary.point.append(schema.point(x=-config.road_width, y=-self._size))
-
-        northRight = schema.lanelet(leftBoundary=schema.boundary(), rightBoundary=schema.boundary())
-        northRight.leftBoundary.lineMarking = "dashed"
-        northRight.rightBoundary.lineMarking = "solid"
-        northRight.leftBoundary.point.append(schema.point(x=0, y=self._size))
-        northRight.leftBoundary.point.append(schema.point(x=0, y=config.road_width))
-        northRight.rightBoundary.point.append(schema.point(x=-config.road_width, y=self._size))
-        northRight.rightBoundary.point.append(schema.point(x=-config.road_width, y=config.road_width))
-
-        northLeft = schema.lanelet(leftBoundary=schema.boundary(), rightBoundary=schema.boundary())
-        northLeft.rightBoundary.lineMarking = "solid"
-        northLeft.leftBoundary.point.append(schema.point(x=0, y=config.road_width))
-        northLeft.leftBoundary.point.append(schema.point(x=0, y=self._size))
-        northLeft.rightBoundary.point.append(schema.point(x=config.road_width, y=config.road_width))
-        northLeft.rightBoundary.point.append(schema.point(x=config.road_width, y=self._size))
-
-        eastRight = schema.lanelet(leftBoundary=schema.boundary(), rightBoundary=schema.boundary())
-        eastRight.rightBoundary.lineMarking = "solid"
-        eastRight.leftBoundary.point.append(schema.point(x=self._size, y=0))
-        eastRight.leftBoundary.point.append(schema.point(x=config.road_width, y=0))
-        eastRight.rightBoundary.point.append(schema.point(x=self._size, y=config.road_width))
-        eastRight.rightBoundary.point.append(schema.point(x=config.road_width, y=config.road_width))
-
-        eastLeft = schema.lanelet(leftBoundary=schema.boundary(), rightBoundary=schema.boundary())
-        eastLeft.rightBoundary.lineMarking = "solid"
-        eastLeft.leftBoundary.lineMarking = "dashed"
-        eastLeft.leftBoundary.point.append(schema.point(x=config.road_width, y=0))
-        eastLeft.leftBoundary.point.append(schema.point(x=self._size, y=0))
-        eastLeft.rightBoundary.point.append(schema.point(x=config.road_width, y=-config.road_width))
-        eastLeft.rightBoundary.point.append(schema.point(x=self._size, y=-config.road_width))
-
-        westRight = schema.lanelet(leftBoundary=schema.boundary(), rightBoundary=schema.boundary())
-        westRight.rightBoundary.lineMarking = "solid"
-        westRight.leftBoundary.point.append(schema.point(x=-self._size, y=0))
-        westRight.leftBoundary.point.append(schema.point(x=-config.road_width, y=0))
-        westRight.rightBoundary.point.append(schema.point(x=-self._size, y=-config.road_width))
-        westRight.rightBoundary.point.append(schema.point(x=-config.road_width, y=-config.road_width))
-
-        westLeft = schema.lanelet(leftBoundary=schema.boundary(), rightBoundary=schema.boundary())
-        westLeft.leftBoundary.lineMarking = "dashed"
-        westLeft.rightBoundary.lineMarking = "solid"
-        westLeft.leftBoundary.point.append(schema.point(x=-config.road_width, y=0))
-        westLeft.leftBoundary.point.append(schema.point(x=-self._size, y=0))
-        westLeft.rightBoundary.point.append(schema.point(x=-config.road_width, y=config.road_width))
-        westLeft.rightBoundary.point.append(schema.point(x=-self._size, y=config.road_width))
+        size = self._size
+        width = config.road_width
+
+        southRight = scenario.Lanelet(
+            scenario.Boundary([[0, -size], [0, -width]], "dashed"),
+            scenario.Boundary([[width, -size], [width, -width]], "solid"))
+        southLeft = scenario.Lanelet(
+            scenario.Boundary([[0, -width], [0, -size]]),
+            scenario.Boundary([[-width, -width], [-width, -size]], "solid"))
+        northRight = scenario.Lanelet(
+            scenario.Boundary([[0, size], [0, width]], "dashed"),
+            scenario.Boundary([[-width, size], [-width, width]], "solid"))
+        northLeft = scenario.Lanelet(
+            scenario.Boundary([[0, width], [0, size]]),
+            scenario.Boundary([[width, width], [width, size]], "solid"))
+        eastRight = scenario.Lanelet(
+            scenario.Boundary([[size, 0], [width, 0]]),
+            scenario.Boundary([[size, width], [width, width]], "solid"))
+        eastLeft = scenario.Lanelet(
+            scenario.Boundary([[width, 0], [size, 0]], "dashed"),
+            scenario.Boundary([[width, -width], [size, -width]], "solid"))
+        westRight = scenario.Lanelet(
+            scenario.Boundary([[-size, 0], [-width, 0]]),
+            scenario.Boundary([[-size, -width], [-width, -width]], "solid"))
+        westLeft = scenario.Lanelet(
+            scenario.Boundary([[-width, 0], [-size, 0]], "dashed"),
+            scenario.Boundary([[-width, width], [-size, width]], "solid"))
 
         if self._rule == "equal":
-            northRight.stopLine = "dashed"
-            westRight.stopLine = "dashed"
-            eastRight.stopLine = "dashed"
-            southRight.stopLine = "dashed"
+            northRight.stop_line = "dashed"
+            westRight.stop_line = "dashed"
+            eastRight.stop_line = "dashed"
+            southRight.stop_line = "dashed"
         elif self._rule == "priority-yield" and self._target_dir == "straight":
-            westRight.stopLine = "dashed"
-            eastRight.stopLine = "dashed"
+            westRight.stop_line = "dashed"
+            eastRight.stop_line = "dashed"
         elif self._rule == "priority-stop" and self._target_dir == "straight":
-            westRight.stopLine = "solid"
-            eastRight.stopLine = "solid"
+            westRight.stop_line = "solid"
+            eastRight.stop_line = "solid"
         elif self._rule == "yield":
-            northRight.stopLine = "dashed"
-            southRight.stopLine = "dashed"
+            northRight.stop_line = "dashed"
+            southRight.stop_line = "dashed"
         elif self._rule == "stop":
-            northRight.stopLine = "solid"
-            southRight.stopLine = "solid"
+            northRight.stop_line = "solid"
+            southRight.stop_line = "solid"
 
         result = [southRight, southLeft, northLeft, northRight,
             eastLeft, eastRight, westLeft, westRight]
         pairs = [(southRight, southLeft)]
 
         if self._target_dir == "left":
-            right_lanelet = schema.lanelet(leftBoundary=schema.boundary(), rightBoundary=schema.boundary())
-            right_lanelet.rightBoundary.lineMarking = "dashed"
-            right_lanelet.leftBoundary.lineMarking = "dashed"
-            for angle in np.arange(0, math.pi/2, math.pi/20):
-                right_lanelet.rightBoundary.point.append(schema.point(x=-config.road_width + math.cos(angle) * config.road_width * 2,
-                    y=-config.road_width + math.sin(angle) * config.road_width * 2))
-                right_lanelet.leftBoundary.point.append(schema.point(x=-config.road_width + math.cos(angle) * config.road_width,
-                    y=-config.road_width + math.sin(angle) * config.road_width))
-            left_lanelet = schema.lanelet(leftBoundary=schema.boundary(), rightBoundary=schema.boundary())
-            for angle in np.arange(math.pi/2, 0, -math.pi/20):
-                left_lanelet.leftBoundary.point.append(schema.point(x=-config.road_width + math.cos(angle) * config.road_width,
-                    y=-config.road_width + math.sin(angle) * config.road_width))
-                left_lanelet.rightBoundary.point.append(schema.point(x=-config.road_width,
-                    y=-config.road_width))
+            arc = unit_arc(np.arange(0, math.pi/2, math.pi/20))
+            right_lanelet = scenario.Lanelet(
+                scenario.Boundary(-width + arc * width, "dashed"),
+                scenario.Boundary(-width + arc * width * 2, "dashed"))
+            arc = unit_arc(np.arange(math.pi/2, 0, -math.pi/20))
+            left_lanelet = scenario.Lanelet(
+                scenario.Boundary(-width + arc * width),
+                scenario.Boundary(np.full(arc.shape, -width)))
             result.append(right_lanelet)
             result.append(left_lanelet)
             pairs.append((right_lanelet, left_lanelet))
             pairs.append((westLeft, westRight))
-            result.append(schema.trafficSign(type="stvo-209-10",
-                orientation=math.pi*1.5, centerPoint=schema.point(
-                x=config.road_width + 0.1, y= -config.road_width - 0.25)))
+            result.append(scenario.TrafficSign("stvo-209-10", math.pi*1.5,
+                [width + 0.1, -width - 0.25]))
         elif self._target_dir == "right":
-            right_lanelet = schema.lanelet(leftBoundary=schema.boundary(), rightBoundary=schema.boundary())
-            right_lanelet.leftBoundary.lineMarking = "dashed"
-            for angle in np.arange(math.pi, math.pi/2, -math.pi/20):
-                right_lanelet.rightBoundary.point.append(schema.point(x=config.road_width,
-                    y=-config.road_width))
-                right_lanelet.leftBoundary.point.append(schema.point(x=config.road_width + math.cos(angle) * config.road_width,
-                    y=-config.road_width + math.sin(angle) * config.road_width))
-            left_lanelet = schema.lanelet(leftBoundary=schema.boundary(), rightBoundary=schema.boundary())
-            left_lanelet.rightBoundary.lineMarking = "dashed"
-            for angle in np.arange(math.pi/2, math.pi, math.pi/20):
-                left_lanelet.leftBoundary.point.append(schema.point(x=config.road_width + math.cos(angle) * config.road_width,
-                    y=-config.road_width + math.sin(angle) * config.road_width))
-                left_lanelet.rightBoundary.point.append(schema.point(x=config.road_width + math.cos(angle) * config.road_width * 2,
-                    y=-config.road_width + math.sin(angle) * config.road_width * 2))
+            offset = np.array([width, -width])
+            arc = unit_arc(np.arange(math.pi, math.pi/2, -math.pi/20))
+            right_lanelet = scenario.Lanelet(
+                scenario.Boundary(offset + arc * width, "dashed"),
+                scenario.Boundary(np.tile(offset, (len(arc), 1))))
+            arc = unit_arc(np.arange(math.pi/2, math.pi, math.pi/20))
+            left_lanelet = scenario.Lanelet(
+                scenario.Boundary(offset + arc * width),
+                scenario.Boundary(offset + arc * width * 2, "dashed"))
             result.append(right_lanelet)
             result.append(left_lanelet)
             pairs.append((right_lanelet, left_lanelet))
             pairs.append((eastLeft, eastRight))
-            result.append(schema.trafficSign(type="stvo-209-20",
-                orientation=math.pi*1.5, centerPoint=schema.point(
-                x=config.road_width + 0.1, y= -config.road_width - 0.25)))
+            result.append(scenario.TrafficSign("stvo-209-20", math.pi*1.5,
+                [width + 0.1, -width - 0.25]))
         elif self._target_dir == "straight":
-            right_lanelet = schema.lanelet(leftBoundary=schema.boundary(), rightBoundary=schema.boundary())
-            right_lanelet.rightBoundary.point.append(schema.point(x=config.road_width, y=-config.road_width))
-            right_lanelet.rightBoundary.point.append(schema.point(x=config.road_width, y=config.road_width))
-            right_lanelet.leftBoundary.point.append(schema.point(x=0, y=-config.road_width))
-            right_lanelet.leftBoundary.point.append(schema.point(x=0, y=config.road_width))
-            left_lanelet = schema.lanelet(leftBoundary=schema.boundary(), rightBoundary=schema.boundary())
-            left_lanelet.rightBoundary.point.append(schema.point(x=-config.road_width, y=config.road_width))
-            left_lanelet.rightBoundary.point.append(schema.point(x=-config.road_width, y=-config.road_width))
-            left_lanelet.leftBoundary.point.append(schema.point(x=0, y=config.road_width))
-            left_lanelet.leftBoundary.point.append(schema.point(x=0, y=-config.road_width))
+            right_lanelet = scenario.Lanelet(
+                scenario.Boundary([[0, -width], [0, width]]),
+                scenario.Boundary([[width, -width], [width, width]]))
+            left_lanelet = scenario.Lanelet(
+                scenario.Boundary([[0, width], [0, -width]]),
+                scenario.Boundary([[-width, width], [-width, -width]]))
             result.append(right_lanelet)
             result.append(left_lanelet)
             pairs.append((right_lanelet, left_lanelet))
@@ -526,9 +799,8 @@ class Intersection(Primitive):
         type_map = {"priority-yield":"stvo-306", "priority-stop":"stvo-306",
             "yield":"stvo-205", "stop":"stvo-206"}
         if self._rule in type_map:
-            result.append(schema.trafficSign(type=type_map[self._rule],
-                orientation=math.pi*1.5, centerPoint=schema.point(
-                x=config.road_width + 0.1, y= -config.road_width - 0.5)))
+            result.append(scenario.TrafficSign(type_map[self._rule],
+                math.pi*1.5, [width + 0.1, -width - 0.5]))
 
         return Export(result, pairs)
 
@@ -545,16 +817,20 @@ class StraightLineObstacle(StraightLine):
             y -= self._width / 2
         elif self._anchor == "right":
             y += self._width / 2
-        rect = schema.rectangle(length=self._length,
-            width=self._width, orientation=0,
-            centerPoint=schema.point(x=self._length / 2, y=y))
-        obstacle = schema.obstacle(role="static", type="parkedVehicle", shape=schema.shape())
-        obstacle.shape.rectangle.append(rect)
+        rect = scenario.Rectangle(self._length, self._width, 0,
+            [self._length / 2, y])
+        obstacle = scenario.Obstacle("static", "parkedVehicle",
+            scenario.Shape(rectangles=[rect]))
 
         export = super().export(config)
         export.objects.append(obstacle)
         return export
 
+def parking_lanelet(length, road_width):
+    return scenario.Lanelet(
+        scenario.Boundary([[0, -road_width], [length, -road_width]]),
+        scenario.Boundary([[0, -road_width - 0.3], [length, -road_width - 0.3]], "solid"))
+
 class ParkingObstacle(StraightLine):
     def __init__(self, args):
         super().__init__(args)
@@ -562,18 +838,12 @@ class ParkingObstacle(StraightLine):
 
     def export(self, config):
         y = - config.road_width - 0.3 + self._width / 2
-        rect = schema.rectangle(length=self._length,
-            width=self._width, orientation=0,
-            centerPoint=schema.point(x=self._length / 2, y=y))
-        obstacle = schema.obstacle(role="static", type="parkedVehicle", shape=schema.shape())
-        obstacle.shape.rectangle.append(rect)
-
-        parking_lane = schema.lanelet(leftBoundary=schema.boundary(), rightBoundary=schema.boundary())
-        parking_lane.leftBoundary.point.append(schema.point(x=0, y=-config.road_width))
-        parking_lane.leftBoundary.point.append(schema.point(x=self._length, y=-config.road_width))
-        parking_lane.rightBoundary.point.append(schema.point(x=0, y=-config.road_width - 0.3))
-        parking_lane.rightBoundary.point.append(schema.point(x=self._length, y=-config.road_width - 0.3))
-        parking_lane.rightBoundary.lineMarking = "solid"
+        rect = scenario.Rectangle(self._length, self._width, 0,
+            [self._length / 2, y])
+        obstacle = scenario.Obstacle("static", "parkedVehicle",
+            scenario.Shape(rectangles=[rect]))
+
+        parking_lane = parking_lanelet(self._length, config.road_width)
 
         export = super().export(config)
         export.objects.append(obstacle)
@@ -585,12 +855,7 @@ class ParkingLot(StraightLine):
         super().__init__(args)
 
     def export(self, config):
-        parking_lane = schema.lanelet(leftBoundary=schema.boundary(), rightBoundary=schema.boundary())
-        parking_lane.leftBoundary.point.append(schema.point(x=0, y=-config.road_width))
-        parking_lane.leftBoundary.point.append(schema.point(x=self._length, y=-config.road_width))
-        parking_lane.rightBoundary.point.append(schema.point(x=0, y=-config.road_width - 0.3))
-        parking_lane.rightBoundary.point.append(schema.point(x=self._length, y=-config.road_width - 0.3))
-        parking_lane.rightBoundary.lineMarking = "solid"
+        parking_lane = parking_lanelet(self._length, config.road_width)
 
         export = super().export(config)
         export.objects.append(parking_lane)
@@ -602,12 +867,10 @@ class BlockedAreaObstacle(StraightLine):
         self._obst_width = float(args["width"])
 
     def export(self, config):
-        rect = schema.rectangle(length=self._length, width=self._obst_width,
-            orientation=0, centerPoint=schema.point(x=self._length/2,
-            y=-config.road_width+self._obst_width/2))
-        obstacle = schema.obstacle(role="static", type="blockedArea",
-            shape=schema.shape())
-        obstacle.shape.rectangle.append(rect)
+        rect = scenario.Rectangle(self._length, self._obst_width, 0,
+            [self._length/2, -config.road_width+self._obst_width/2])
+        obstacle = scenario.Obstacle("static", "blockedArea",
+            scenario.Shape(rectangles=[rect]))
 
         export = super().export(config)
         export.objects.append(obstacle)
@@ -623,12 +886,10 @@ class ZebraCrossing(StraightLine):
         })
 
     def export(self, config):
-        zebra = schema.lanelet(leftBoundary=schema.boundary(), rightBoundary=schema.boundary())
-        zebra.type = "zebraCrossing"
-        zebra.leftBoundary.point.append(schema.point(x=0, y=-config.road_width))
-        zebra.leftBoundary.point.append(schema.point(x=0, y=config.road_width))
-        zebra.rightBoundary.point.append(schema.point(x=self._length, y=-config.road_width))
-        zebra.rightBoundary.point.append(schema.point(x=self._length, y=config.road_width))
+        zebra = scenario.Lanelet(
+            scenario.Boundary([[0, -config.road_width], [0, config.road_width]]),
+            scenario.Boundary([[self._length, -config.road_width], [self._length, config.road_width]]),
+            type="zebraCrossing")
 
         export = super().export(config)
         export.objects.append(zebra)
@@ -640,9 +901,8 @@ class TrafficSign(StraightLine):
         self._traffic_sign = args["type"]
 
     def export(self, config):
-        traffic_sign = schema.trafficSign(type=self._traffic_sign,
-            orientation=math.pi, centerPoint=schema.point(x=self._length / 2,
-            y=-config.road_width - 0.15))
+        traffic_sign = scenario.TrafficSign(self._traffic_sign, math.pi,
+            [self._length / 2, -config.road_width - 0.15])
 
         export = super().export(config)
         export.objects.append(traffic_sign)
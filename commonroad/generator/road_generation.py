@@ -4,6 +4,75 @@ import matplotlib.pyplot as plt
 import numpy as np
 import random
 import sys
+import time
+
+# how often a chunk is redrawn before the chunk in front of it is redrawn too
+MAX_CHUNK_RETRIES = 8
+# total number of backtracks before the whole preset is evaluated again
+MAX_BACKTRACKS = 500
+# cell size of the corridor grid in road units
+GRID_CELL_SIZE = 1.0
+
+class GenerationStats:
+    def __init__(self):
+        self.attempts = 0
+        self.backtracks = 0
+        self.restarts = 0
+        self.accept_time = 0
+        self.template_hits = 0
+        self.template_misses = 0
+
+    def add(self, stats):
+        self.attempts += stats.attempts
+        self.backtracks += stats.backtracks
+        self.restarts += stats.restarts
+        self.accept_time += stats.accept_time
+        self.template_hits += stats.template_hits
+        self.template_misses += stats.template_misses
+
+    def __repr__(self):
+        return ("GenerationStats(attempts={}, backtracks={}, restarts={}, accept_time={:.3f}, "
+            "template_hits={}, template_misses={})").format(
+            self.attempts, self.backtracks, self.restarts, self.accept_time,
+            self.template_hits, self.template_misses)
+
+class CorridorIndex:
+    """Uniform grid over the corridor polygons of the placed primitives.
+    Polygons can only be removed in reverse order of insertion."""
+    def __init__(self, cell_size=GRID_CELL_SIZE):
+        self._cell_size = cell_size
+        self._cells = {}
+        self._polygons = []
+        self._polygon_cells = []
+
+    def __len__(self):
+        return len(self._polygons)
+
+    def _get_cells(self, polygon):
+        (x_min, y_min, x_max, y_max) = polygon.bounds
+        return [(x, y)
+            for x in range(math.floor(x_min / self._cell_size), math.floor(x_max / self._cell_size) + 1)
+            for y in range(math.floor(y_min / self._cell_size), math.floor(y_max / self._cell_size) + 1)]
+
+    def push(self, polygon):
+        cells = self._get_cells(polygon)
+        for cell in cells:
+            self._cells.setdefault(cell, []).append(len(self._polygons))
+        self._polygons.append(polygon)
+        self._polygon_cells.append(cells)
+
+    def pop(self):
+        for cell in self._polygon_cells.pop():
+            self._cells[cell].pop()
+        self._polygons.pop()
+
+    def intersects(self, polygon, skip_last=1):
+        """Check polygon against all stored polygons except the last ones"""
+        limit = len(self._polygons) - skip_last
+        candidates = set()
+        for cell in self._get_cells(polygon):
+            candidates.update(i for i in self._cells.get(cell, []) if i < limit)
+        return any(self._polygons[i].intersects(polygon) for i in candidates)
 
 def norm_angle(angle):
     while angle > 2 * math.pi:
@@ -12,41 +81,83 @@ def norm_angle(angle):
         angle += 2 * math.pi
     return angle
 
-def generate_road(primitives, padding):
-    new_primitives = [primitives[0]]
-
-    for i in range(1, len(primitives)):
-        last_primitive = new_primitives[i-1]
-        current_primitive = primitives[i]
-
-        (point, angle, curv) = last_primitive.get_ending()
-        target_point = point + np.array([
-            math.cos(angle) * padding,
-            math.sin(angle) * padding
-        ])
-        target_angle = norm_angle(angle + math.pi)
-        (begin_point, begin_angle, begin_curv) = current_primitive.get_beginning()
-        new_primitives.append(primitive.TransrotPrimitive(current_primitive,
-            target_point - begin_point, target_angle - begin_angle))
-
-    return new_primitives
-
-def check_intersections(road, road_width):
-    for i in range(len(road)-1):
-        for j in range(i+2, len(road)):
-            p1 = road[i].get_bounding_box(road_width)
-            p2 = road[j].get_bounding_box(road_width)
-            if p1.intersects(p2):
-                return True
-    return False
-
-def generate(root):
+def place_primitive(last_primitive, current_primitive, padding):
+    (point, angle, curv) = last_primitive.get_ending()
+    target_point = point + np.array([
+        math.cos(angle) * padding,
+        math.sin(angle) * padding
+    ])
+    target_angle = norm_angle(angle + math.pi)
+    (begin_point, begin_angle, begin_curv) = current_primitive.get_beginning()
+    return primitive.TransrotPrimitive(current_primitive,
+        target_point - begin_point, target_angle - begin_angle)
+
+def place_chunk(chunk, road, index, road_width):
+    """Append the primitives of chunk to road if none of them collides with
+    the road placed so far. Returns False and leaves road untouched otherwise."""
+    count = 0
+    for p in chunk.primitives:
+        if len(road) > 0:
+            p = place_primitive(road[-1], p, 0)
+        polygon = p.get_bounding_box(road_width)
+        if index.intersects(polygon):
+            for _ in range(count):
+                road.pop()
+                index.pop()
+            return False
+        road.append(p)
+        index.push(polygon)
+        count += 1
+    return True
+
+def place_road(preset, stats):
+    chunks = list(preset.chunks)
+    retries = [0] * len(chunks)
+    placed = []
+    road = []
+    index = CorridorIndex()
+    backtracks = 0
+
+    i = 0
+    while i < len(chunks):
+        stats.attempts += 1
+        if place_chunk(chunks[i], road, index, preset.road_width):
+            placed.append(len(chunks[i].primitives))
+            i += 1
+            continue
+
+        stats.backtracks += 1
+        backtracks += 1
+        if backtracks > MAX_BACKTRACKS:
+            return None
+
+        retries[i] += 1
+        if retries[i] > MAX_CHUNK_RETRIES and i > 0:
+            # this chunk does not fit behind its predecessor, redraw that too
+            retries[i] = 0
+            i -= 1
+            for _ in range(placed.pop()):
+                road.pop()
+                index.pop()
+        chunks[i] = chunks[i].resample()
+
+    return road
+
+def generate(root, stats=None, sampling=None):
+    if stats is None:
+        stats = GenerationStats()
     random.seed()
+    start = time.perf_counter()
+    hits = primitive.TEMPLATE_CACHE.hits
+    misses = primitive.TEMPLATE_CACHE.misses
     while True:
-        preset = preset_parser.eval(root)
-        primitives = preset.primitives
-        road = generate_road(primitives, 0)
-        if not check_intersections(road, preset.road_width):
+        preset = preset_parser.eval(root, sampling)
+        road = place_road(preset, stats)
+        if road is not None:
             break
+        stats.restarts += 1
+    stats.accept_time += time.perf_counter() - start
+    stats.template_hits += primitive.TEMPLATE_CACHE.hits - hits
+    stats.template_misses += primitive.TEMPLATE_CACHE.misses - misses
 
     return road
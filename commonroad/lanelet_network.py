@@ -0,0 +1,88 @@
+"""Indexed view of the lanelets of a scenario
+
+Lanelets are looked up by id through a dict, successors and predecessors are
+stored as index arrays in compressed row form, so following a road is linear
+in its length instead of scanning all lanelets for every step.
+"""
+import numpy as np
+
+# number of centreline samples per lanelet
+CENTERLINE_STEPS = 20
+
+def adjacency(lanelets, attr, index):
+    """Return (offsets, indices): the neighbours of lanelet i are
+    indices[offsets[i]:offsets[i+1]], in the order of the reference list."""
+    offsets = [0]
+    indices = []
+    for lanelet in lanelets:
+        refs = getattr(lanelet, attr)
+        if refs is not None:
+            # dangling references are skipped
+            indices += [index[ref] for ref in refs if ref in index]
+        offsets.append(len(indices))
+    return (np.array(offsets, dtype=int), np.array(indices, dtype=int))
+
+def boundary_point_lengths(boundary):
+    delta = np.diff(boundary.points, axis=0)
+    return np.concatenate(([0], np.cumsum(np.sqrt(np.sum(delta * delta, axis=1)))))
+
+def resample_boundary(boundary, steps):
+    lengths = boundary_point_lengths(boundary)
+    eval_marks = np.arange(0, lengths[-1], lengths[-1]/steps)
+    return np.column_stack((
+        np.interp(eval_marks, lengths, boundary.points[:,0]),
+        np.interp(eval_marks, lengths, boundary.points[:,1])))
+
+class LaneletNetwork:
+    def __init__(self, lanelets):
+        self.lanelets = list(lanelets)
+        self._index = {lanelet.id: i for (i, lanelet) in enumerate(self.lanelets)}
+        (self._successor_offsets, self._successors) = adjacency(
+            self.lanelets, "successors", self._index)
+        (self._predecessor_offsets, self._predecessors) = adjacency(
+            self.lanelets, "predecessors", self._index)
+        self._centerlines = {}
+
+    def __len__(self):
+        return len(self.lanelets)
+
+    def __iter__(self):
+        return iter(self.lanelets)
+
+    def index(self, id):
+        return self._index.get(id)
+
+    def get(self, id):
+        i = self._index.get(id)
+        return self.lanelets[i] if i is not None else None
+
+    def successor_indices(self, i):
+        return self._successors[self._successor_offsets[i]:self._successor_offsets[i+1]]
+
+    def predecessor_indices(self, i):
+        return self._predecessors[self._predecessor_offsets[i]:self._predecessor_offsets[i+1]]
+
+    def successors(self, lanelet):
+        return [self.lanelets[i] for i in self.successor_indices(self._index[lanelet.id])]
+
+    def predecessors(self, lanelet):
+        return [self.lanelets[i] for i in self.predecessor_indices(self._index[lanelet.id])]
+
+    def start_lanelet(self):
+        for lanelet in self.lanelets:
+            if lanelet.is_start:
+                return lanelet
+        return None
+
+    def centerline(self, lanelet):
+        """Middle between the equidistantly resampled boundaries, as (N,2)
+        array. Computed once per lanelet."""
+        i = self._index[lanelet.id]
+        if i not in self._centerlines:
+            left = resample_boundary(lanelet.left_boundary, CENTERLINE_STEPS)
+            right = resample_boundary(lanelet.right_boundary, CENTERLINE_STEPS)
+            count = min(len(left), len(right))
+            centerline = (left[:count] + right[:count]) / 2
+            centerline.flags.writeable = False
+            self._centerlines[i] = centerline
+        return self._centerlines[i]
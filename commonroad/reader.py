@@ -0,0 +1,92 @@
+"""Fast CommonRoad XML reader
+
+Parses a CommonRoad document with lxml.etree.iterparse into the scenario
+model of commonroad.scenario. Unlike schema.CreateFromDocument no binding
+object is created per point, boundaries are read straight into NumPy arrays.
+The input is not validated against the schema.
+"""
+from lxml import etree
+import numpy as np
+from commonroad import scenario
+
+# x and y of all points in document order
+_POINT_COORDS = etree.XPath("point/x/text() | point/y/text()")
+
+def read_points(element):
+    return np.array(_POINT_COORDS(element), dtype=float).reshape(-1, 2)
+
+def read_point(element):
+    return np.array([float(element.findtext("x")), float(element.findtext("y"))])
+
+def read_boundary(element):
+    return scenario.Boundary(read_points(element),
+        element.findtext("lineMarking"))
+
+def read_ref_list(element):
+    if element is None:
+        return None
+    return [int(ref.get("ref")) for ref in element.iterfind("lanelet")]
+
+def read_lanelet(element):
+    lanelet = scenario.Lanelet(
+        read_boundary(element.find("leftBoundary")),
+        read_boundary(element.find("rightBoundary")),
+        type=element.findtext("type"),
+        is_start=element.findtext("isStart") in ("true", "1"),
+        stop_line=element.findtext("stopLine"))
+    lanelet.id = int(element.get("id"))
+    lanelet.predecessors = read_ref_list(element.find("predecessor"))
+    lanelet.successors = read_ref_list(element.find("successor"))
+    for (tag, attr) in (("adjacentLeft", "adjacent_left"), ("adjacentRight", "adjacent_right")):
+        adjacent = element.find(tag)
+        if adjacent is not None:
+            setattr(lanelet, attr, int(adjacent.get("ref")))
+            setattr(lanelet, attr + "_dir", adjacent.get("drivingDir"))
+    return lanelet
+
+def read_shape(element):
+    shape = scenario.Shape()
+    for rect in element.iterfind("rectangle"):
+        shape.rectangles.append(scenario.Rectangle(
+            float(rect.findtext("length")), float(rect.findtext("width")),
+            float(rect.findtext("orientation")), read_point(rect.find("centerPoint"))))
+    for circle in element.iterfind("circle"):
+        shape.circles.append(scenario.Circle(float(circle.findtext("radius")),
+            read_point(circle.find("centerPoint"))))
+    for polygon in element.iterfind("polygon"):
+        shape.polygons.append(scenario.Polygon(read_points(polygon)))
+    return shape
+
+def read_obstacle(element):
+    obstacle = scenario.Obstacle(element.findtext("role"),
+        element.findtext("type"), read_shape(element.find("shape")))
+    obstacle.id = int(element.get("id"))
+    return obstacle
+
+def read_traffic_sign(element):
+    sign = scenario.TrafficSign(element.findtext("type"),
+        float(element.findtext("orientation")),
+        read_point(element.find("centerPoint")))
+    sign.id = int(element.get("id"))
+    return sign
+
+READERS = {
+    "lanelet": read_lanelet,
+    "obstacle": read_obstacle,
+    "trafficSign": read_traffic_sign
+}
+
+def read_scenario(source):
+    """Read a scenario from a file name or a binary file object"""
+    doc = scenario.Scenario()
+    for (_, element) in etree.iterparse(source, events=("end",), tag=tuple(READERS)):
+        # nested elements with the same tag, e.g. lanelet refs, are
+        # handled by their parent
+        if element.getparent() is None or element.getparent().getparent() is not None:
+            continue
+        doc.append(READERS[element.tag](element))
+        # free everything parsed so far
+        element.clear()
+        while element.getprevious() is not None:
+            del element.getparent()[0]
+    return doc
@@ -0,0 +1,39 @@
+from commonroad.renderer.tile_cache import DEFAULT_MAX_SIZE
+from commonroad.renderer.groundplane import PIXEL_PER_UNIT, TILE_SIZE, PADDING
+from commonroad.renderer.png import DEFAULT_COMPRESSION
+
+class RenderConfig:
+    """Options of gazebo-renderer that change how the world is rendered"""
+    def __init__(self, jobs=1, sparse=False, empty_ground="plane",
+            tile_cache=None, tile_cache_size=DEFAULT_MAX_SIZE,
+            fingerprint="sha256", pixel_per_unit=PIXEL_PER_UNIT,
+            tile_size=TILE_SIZE, padding=PADDING, compression=DEFAULT_COMPRESSION,
+            writers=2, tile_stats=None, recording=False):
+        # number of processes rendering ground plane tiles
+        self.jobs = jobs
+        # only render tiles that contain road markings or obstacles
+        self.sparse = sparse
+        # what covers the skipped tiles in sparse mode, "plane" or "none"
+        self.empty_ground = empty_ground
+        # directory of the persistent tile cache, None disables it
+        self.tile_cache = tile_cache
+        # size in bytes the tile cache is reduced to after rendering
+        self.tile_cache_size = tile_cache_size
+        # how tiles are named: "sha256" or "blake2b" of the pixels, or
+        # "geometry", a hash of what is drawn on the tile before rendering
+        self.fingerprint = fingerprint
+        # texture resolution of the ground plane
+        self.pixel_per_unit = pixel_per_unit
+        # width and height of a tile in pixels
+        self.tile_size = tile_size
+        # ground plane around the road in road units
+        self.padding = padding
+        # zlib level of the textures, 1 is fast, 9 is small
+        self.compression = compression
+        # threads per process encoding and writing tiles in the background
+        self.writers = writers
+        # CSV file receiving bytes written and encode time of every tile
+        self.tile_stats = tile_stats
+        # draw every road marking once into a cairo recording and replay
+        # the ones touching a tile, False draws every tile from the plan
+        self.recording = recording
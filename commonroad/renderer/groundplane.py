@@ -1,51 +1,91 @@
 #import cairo
 import cairocffi as cairo
 import math
-from commonroad import utils
+from commonroad import utils, scenario, lanelet_network
+from commonroad.renderer import tile_cache, png
 from os import path
 import os
+import csv
 import hashlib
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool
 from tqdm import tqdm
 import numpy as np
+from shapely.geometry import LineString, box
+from shapely.strtree import STRtree
+import shapely
 
+# defaults of RenderConfig
 PIXEL_PER_UNIT = 500
 TILE_SIZE = 2048
 PADDING = 3
 
+# line styles in road units
+BOUNDARY_LINE_WIDTH = 0.02
+BOUNDARY_DASH = [0.2, 0.2]
+STOP_LINE_WIDTH = 0.04
+STOP_LINE_DASH = [0.08, 0.06]
+STRIPE_LINE_WIDTH = 0.02
+STRIPE_DISTANCE = 0.08
+ZEBRA_STRIPE_WIDTH = 0.04
+ZEBRA_OFFSET = 0.02
+LINE_STYLES = (BOUNDARY_LINE_WIDTH, BOUNDARY_DASH, STOP_LINE_WIDTH,
+    STOP_LINE_DASH, STRIPE_LINE_WIDTH, STRIPE_DISTANCE, ZEBRA_STRIPE_WIDTH,
+    ZEBRA_OFFSET)
+# change whenever the drawing code changes, invalidates cached tiles
+TILE_CACHE_VERSION = 5
+# digits of tile-relative coordinates in geometry fingerprints
+GEOMETRY_DECIMALS = 9
+# bytes of blake2b fingerprints
+FINGERPRINT_DIGEST_SIZE = 16
+# widest stroke on the ground plane
+MAX_LINE_WIDTH = max(BOUNDARY_LINE_WIDTH, STOP_LINE_WIDTH, STRIPE_LINE_WIDTH)
+# cairo's default, miter joins reach at most this many half line widths
+MITER_LIMIT = 10
+# tiles a process renders before waiting for their files to be written
+TILE_BATCH = 8
+# rough size of a path point and of a drawing command in a cairo recording
+RECORDED_POINT_BYTES = 16
+RECORDED_COMMAND_BYTES = 512
+
 def draw_boundary(ctx, boundary):
-    if boundary.lineMarking is None:
+    if boundary.line_marking is None:
         return
-    ctx.set_line_width (0.02)
-    if boundary.lineMarking == "dashed":
-        ctx.set_dash([0.2, 0.2])
+    ctx.set_line_width (BOUNDARY_LINE_WIDTH)
+    if boundary.line_marking == "dashed":
+        ctx.set_dash(BOUNDARY_DASH)
     else:
         ctx.set_dash([])
 
-    ctx.move_to(boundary.point[0].x, boundary.point[0].y)
-    for p in boundary.point[1:]:
-        ctx.line_to(p.x, p.y)
+    points = boundary.points.tolist()
+    ctx.move_to(*points[0])
+    for (x, y) in points[1:]:
+        ctx.line_to(x, y)
     ctx.stroke()
 
 def draw_stop_line(ctx, lanelet):
     ctx.save()
-    p1 = lanelet.leftBoundary.point[-1]
-    p2 = lanelet.rightBoundary.point[-1]
+    p1 = lanelet.left_boundary.points[-1]
+    p2 = lanelet.right_boundary.points[-1]
 
-    if lanelet.stopLine:
-        if lanelet.stopLine == "dashed":
-            ctx.set_dash([0.08, 0.06])
+    if lanelet.stop_line:
+        if lanelet.stop_line == "dashed":
+            ctx.set_dash(STOP_LINE_DASH)
         else:
             ctx.set_dash([])
             ctx.set_line_cap(cairo.LINE_CAP_BUTT)
-        ctx.set_line_width(0.04)
-        ctx.move_to(p1.x, p1.y)
-        ctx.line_to(p2.x, p2.y)
+        ctx.set_line_width(STOP_LINE_WIDTH)
+        ctx.move_to(p1[0], p1[1])
+        ctx.line_to(p2[0], p2[1])
         ctx.stroke()
     ctx.restore()
 
 def draw_rectangle(ctx, rectangle):
     ctx.save()
-    ctx.translate(rectangle.centerPoint.x, rectangle.centerPoint.y)
+    ctx.translate(rectangle.center[0], rectangle.center[1])
     ctx.rotate(-rectangle.orientation)
     ctx.rectangle(- rectangle.length / 2, - rectangle.width / 2,
         rectangle.length, rectangle.width)
@@ -53,29 +93,30 @@ def draw_rectangle(ctx, rectangle):
     ctx.restore()
 
 def draw_circle(ctx, circle):
-    ctx.arc(circle.centerPoint.x, circle.centerPoint.y, circle.radius, 0, 2*math.pi)
+    ctx.arc(circle.center[0], circle.center[1], circle.radius, 0, 2*math.pi)
     ctx.fill()
 
 def draw_polygon(ctx, polygon):
-    ctx.move_to(polygon.point[0].x, polygon.point[1].y)
-    for point in polygon.point[1:]:
-        ctx.line_to(point.x, point.y)
+    points = polygon.points.tolist()
+    ctx.move_to(*points[0])
+    for (x, y) in points[1:]:
+        ctx.line_to(x, y)
     ctx.fill()
 
 def draw_shape(ctx, shape):
-    for rect in shape.rectangle:
+    for rect in shape.rectangles:
         draw_rectangle(ctx, rect)
-    for circ in shape.circle:
+    for circ in shape.circles:
         draw_circle(ctx, circ)
-    for poly in shape.polygon:
+    for poly in shape.polygons:
         draw_polygon(ctx, poly)
 
 def draw_stripes_rect(ctx, rectangle):
     ctx.save()
-    ctx.translate(rectangle.centerPoint.x, rectangle.centerPoint.y)
+    ctx.translate(rectangle.center[0], rectangle.center[1])
     ctx.rotate(-rectangle.orientation)
 
-    ctx.set_line_width (0.02)
+    ctx.set_line_width (STRIPE_LINE_WIDTH)
     sheering = rectangle.width / 2
     ctx.move_to(- rectangle.length / 2, - rectangle.width / 2)
     ctx.line_to(rectangle.length / 2, - rectangle.width / 2)
@@ -89,8 +130,8 @@ def draw_stripes_rect(ctx, rectangle):
     end_x = rectangle.length / 2
     y_bottom = - rectangle.width / 2
     y_top = rectangle.width / 2
-    ctx.set_line_width (0.02)
-    for x in np.arange(start_x, end_x, 0.08):
+    ctx.set_line_width (STRIPE_LINE_WIDTH)
+    for x in np.arange(start_x, end_x, STRIPE_DISTANCE):
         ctx.move_to(x, y_bottom)
         ctx.line_to(x + rectangle.width, y_top)
     ctx.stroke()
@@ -98,8 +139,8 @@ def draw_stripes_rect(ctx, rectangle):
     ctx.restore()
 
 def draw_zebra_crossing(ctx, lanelet):
-    left = boundary_to_equi_distant(lanelet.leftBoundary, 0.04, 0.02)
-    right = boundary_to_equi_distant(lanelet.rightBoundary, 0.04, 0.02)
+    left = boundary_to_equi_distant(lanelet.left_boundary, ZEBRA_STRIPE_WIDTH, ZEBRA_OFFSET)
+    right = boundary_to_equi_distant(lanelet.right_boundary, ZEBRA_STRIPE_WIDTH, ZEBRA_OFFSET)
     flag = True
     ctx.save()
     for (l, r) in zip(left, right):
@@ -115,166 +156,733 @@ def draw_zebra_crossing(ctx, lanelet):
             flag = True
     ctx.restore()
 
-def distance_points(p1, p2):
-    dx = p2.x - p1.x
-    dy = p2.y - p1.y
-    return math.sqrt(dx*dx + dy*dy)
-
 def boundary_length(boundary):
-    length = 0
-    for (p1, p2) in zip(boundary.point, boundary.point[1:]):
-        length += distance_points(p1, p2)
-    return length
-
-def boundary_point_lengths(boundary):
-    result = [0]
-    len = 0
-    for (p1, p2) in zip(boundary.point, boundary.point[1:]):
-        len += distance_points(p1, p2)
-        result.append(len)
-    return result
+    return lanelet_network.boundary_point_lengths(boundary)[-1]
 
 def boundary_to_equi_distant(boundary, step_width, offset):
-    lengths = boundary_point_lengths(boundary)
-    x = list(map(lambda p: p.x, boundary.point))
-    y = list(map(lambda p: p.y, boundary.point))
+    lengths = lanelet_network.boundary_point_lengths(boundary)
     eval_marks = np.arange(offset, lengths[-1], step_width)
-    xinterp = np.interp(eval_marks, lengths, x)
-    yinterp = np.interp(eval_marks, lengths, y)
-    return map(lambda i: (i[0],i[1]), zip(xinterp, yinterp))
+    xinterp = np.interp(eval_marks, lengths, boundary.points[:,0])
+    yinterp = np.interp(eval_marks, lengths, boundary.points[:,1])
+    return zip(xinterp.tolist(), yinterp.tolist())
 
 def draw_obstacle(ctx, obstacle):
     if obstacle.type == "blockedArea":
-        for rect in obstacle.shape.rectangle:
+        for rect in obstacle.shape.rectangles:
             draw_stripes_rect(ctx, rect)
     else:
         draw_shape(ctx, obstacle.shape)
 
-def draw_all_boundaries(ctx, lanelet_list, boundary_name):
-    all_ids = [lanelet.id for lanelet in lanelet_list
-        if getattr(lanelet, boundary_name).lineMarking is not None]
-    while len(all_ids) > 0:
-        current_id = all_ids[0]
-        suc = expand_boundary(lanelet_list, get_lanelet_by_id(lanelet_list, current_id), boundary_name, "successor")
-        pred = expand_boundary(lanelet_list, get_lanelet_by_id(lanelet_list, current_id), boundary_name, "predecessor")
-        ids_in_run = pred[::-1] + [current_id] + suc
-
-        for id in ids_in_run:
-            all_ids.remove(id)
-
-        lanelets = list(map(lambda x: get_lanelet_by_id(lanelet_list, x), ids_in_run))
-
-        ctx.save()
-        ctx.set_line_width (0.02)
-        line_marking = getattr(lanelets[0], boundary_name).lineMarking
-        if line_marking == "dashed":
-            ctx.set_dash([0.2, 0.2])
-        elif line_marking == "solid" :
-            ctx.set_dash([])
-
-        ctx.move_to(getattr(lanelets[0], boundary_name).point[0].x,
-            getattr(lanelets[0], boundary_name).point[0].y)
-
-        for lanelet in lanelets:
-            for p in getattr(lanelet, boundary_name).point:
-                ctx.line_to(p.x, p.y)
-        ctx.stroke()
-        ctx.restore()
+class BoundaryRun:
+    """Boundaries of consecutive lanelets with the same line marking, merged
+    into one polyline so dashes continue across lanelet borders. breaks
+    holds the index of the first point of every lanelet and of the last
+    point."""
+    def __init__(self, points, line_marking, breaks):
+        self.points = points
+        self.line_marking = line_marking
+        self.breaks = breaks
+        self.lengths = lanelet_network.boundary_point_lengths(self)
+
+class BoundaryPiece:
+    """Lanelets first to last of a BoundaryRun, culled on their own"""
+    def __init__(self, run, first, last):
+        self.run = run
+        self.first = first
+        self.last = last
+
+    def drawn_range(self):
+        """First and last point drawn. One segment of the neighbours on
+        both sides is drawn too, so joins come out as in the whole run."""
+        breaks = self.run.breaks
+        return (max(breaks[self.first] - 1, 0),
+            min(breaks[self.last + 1] + 1, breaks[-1]))
+
+    def dash_offset(self):
+        """Where the dashes of the run are at the first drawn point"""
+        (begin, _) = self.drawn_range()
+        return math.fmod(self.run.lengths[begin], sum(BOUNDARY_DASH))
+
+def draw_boundary_piece(ctx, piece):
+    run = piece.run
+    (begin, end) = piece.drawn_range()
+    ctx.save()
+    ctx.set_line_width (BOUNDARY_LINE_WIDTH)
+    if run.line_marking == "dashed":
+        # continue the dashes of the run in front of the piece
+        ctx.set_dash(BOUNDARY_DASH, piece.dash_offset())
+    elif run.line_marking == "solid" :
+        ctx.set_dash([])
 
-def get_lanelet_by_id(lanelet_list, id):
-    for lanelet in lanelet_list:
-        if lanelet.id == id:
-            return lanelet
-    return None
+    points = run.points[begin:end + 1].tolist()
+    ctx.move_to(*points[0])
+    for (x, y) in points[1:]:
+        ctx.line_to(x, y)
+    ctx.stroke()
+    ctx.restore()
 
-def expand_boundary(lanelet_list, lanelet, boundary_name, direction):
-    ids = []
-    original_line_type = getattr(lanelet, boundary_name).lineMarking
+def join_pieces(items):
+    """Merge neighbouring pieces of the same run among the items of a tile,
+    drawing them one by one would paint their overlap twice. Merged items
+    have no geometry."""
+    joined = []
+    for (geometry, draw_function, obj) in items:
+        if isinstance(obj, BoundaryPiece) and len(joined) > 0:
+            previous = joined[-1][2]
+            if (isinstance(previous, BoundaryPiece) and previous.run is obj.run
+                    and previous.last + 1 == obj.first):
+                joined[-1] = (None, draw_function,
+                    BoundaryPiece(obj.run, previous.first, obj.last))
+                continue
+        joined.append((geometry, draw_function, obj))
+    return joined
+
+def plan_boundaries(network, boundary_name):
+    """Chain the marked boundaries of all lanelets into runs, done once per
+    document and replayed for every tile"""
+    runs = []
+    done = [getattr(lanelet, boundary_name).line_marking is None
+        for lanelet in network]
+    for current in range(len(network)):
+        if done[current]:
+            continue
+        suc = expand_boundary(network, current, boundary_name, network.successor_indices)
+        pred = expand_boundary(network, current, boundary_name, network.predecessor_indices)
+        indices_in_run = pred[::-1] + [current] + suc
+
+        for i in indices_in_run:
+            done[i] = True
+
+        boundaries = [getattr(network.lanelets[i], boundary_name) for i in indices_in_run]
+        parts = [boundaries[0].points]
+        total = len(parts[0])
+        breaks = [0]
+        for boundary in boundaries[1:]:
+            points = boundary.points
+            if np.array_equal(points[0], parts[-1][-1]):
+                # successors usually start where their predecessor ends
+                points = points[1:]
+                breaks.append(total - 1)
+            else:
+                breaks.append(total)
+            parts.append(points)
+            total += len(points)
+        points = np.concatenate(parts)
+        breaks.append(total - 1)
+        runs.append(BoundaryRun(points, boundaries[0].line_marking, breaks))
+    return runs
+
+def boundary_pieces(run):
+    """One plan item per lanelet of the run, the geometry ends where the
+    next lanelet starts"""
+    return [(LineString(run.points[run.breaks[i]:run.breaks[i + 1] + 1]),
+            draw_boundary_piece, BoundaryPiece(run, i, i))
+        for i in range(len(run.breaks) - 1)]
+
+def plan_ground(doc, network):
+    """Everything painted on the ground plane in drawing order, as a list of
+    (geometry, draw function, object). The geometry covers the painted area
+    without the stroke width."""
+    plan = []
+    for lanelet in doc.lanelets:
+        if lanelet.stop_line:
+            plan.append((LineString([lanelet.left_boundary.points[-1],
+                lanelet.right_boundary.points[-1]]), draw_stop_line, lanelet))
+        if lanelet.type == "zebraCrossing":
+            bounds = utils.get_bounding_box(lanelet)
+            plan.append((box(bounds.x_min, bounds.y_min, bounds.x_max, bounds.y_max),
+                draw_zebra_crossing, lanelet))
+
+    for boundary_name in ["left_boundary", "right_boundary"]:
+        for run in plan_boundaries(network, boundary_name):
+            plan.extend(boundary_pieces(run))
+
+    for obstacle in doc.obstacles:
+        bounds = utils.get_bounding_box(obstacle)
+        plan.append((box(bounds.x_min, bounds.y_min, bounds.x_max, bounds.y_max),
+            draw_obstacle, obstacle))
+    return plan
+
+def cull_margin(pixel_per_unit):
+    # half the widest stroke, stretched by miter joins, plus antialiasing
+    return MAX_LINE_WIDTH / 2 * MITER_LIMIT + 2 / pixel_per_unit
+
+def expand_boundary(network, current, boundary_name, neighbours):
+    """Follow the lanelets with the same line marking as current, returns
+    their indices in the network"""
+    indices = []
+    original_line_type = getattr(network.lanelets[current], boundary_name).line_marking
     found = True
     while found:
         found = False
-        if getattr(lanelet, direction) is not None:
-            for next in getattr(lanelet, direction).lanelet:
-                next_lanelet = get_lanelet_by_id(lanelet_list, next.ref)
-                if getattr(next_lanelet, boundary_name).lineMarking == original_line_type:
-                    lanelet = next_lanelet
-                    ids.append(lanelet.id)
-                    found = True
-                    break
-    return ids
-
-def draw(doc, target_dir):
+        for next in neighbours(current):
+            if getattr(network.lanelets[next], boundary_name).line_marking == original_line_type:
+                current = next
+                indices.append(current)
+                found = True
+                break
+    return indices
+
+class TileGrid:
+    """Tiles covering the padded bounding box of a scenario"""
+    def __init__(self, bounding_box, pixel_per_unit=PIXEL_PER_UNIT,
+            tile_size=TILE_SIZE):
+        self.bounding_box = bounding_box
+        self.pixel_per_unit = pixel_per_unit
+        self.tile_size = tile_size
+        width = math.ceil((bounding_box.x_max - bounding_box.x_min) * pixel_per_unit)
+        height = math.ceil((bounding_box.y_max - bounding_box.y_min) * pixel_per_unit)
+        self.width_num = math.ceil(width / tile_size)
+        self.height_num = math.ceil(height / tile_size)
+
+    @property
+    def tile_extent(self):
+        return self.tile_size / self.pixel_per_unit
+
+    def tiles(self):
+        return [(x,y) for x in range(self.width_num) for y in range(self.height_num)]
+
+    def tile_box(self, x, y, margin=0):
+        """Extent of tile (x, y) in world coordinates"""
+        tile_extent = self.tile_extent
+        tile_x = self.bounding_box.x_min + x * tile_extent
+        tile_y = self.bounding_box.y_min + y * tile_extent
+        return box(tile_x - margin, tile_y - margin,
+            tile_x + tile_extent + margin, tile_y + tile_extent + margin)
+
+    def cull_margin(self):
+        return cull_margin(self.pixel_per_unit)
+
+def tile_grid(doc, config):
     bounding_box = utils.get_bounding_box(doc)
-    bounding_box.x_min -= PADDING
-    bounding_box.y_min -= PADDING
-    bounding_box.x_max += PADDING
-    bounding_box.y_max += PADDING
-    print(bounding_box)
-
-    width = math.ceil((bounding_box.x_max - bounding_box.x_min) * PIXEL_PER_UNIT)
-    height = math.ceil((bounding_box.y_max - bounding_box.y_min) * PIXEL_PER_UNIT)
-
-    width_num = math.ceil(width / TILE_SIZE)
-    height_num = math.ceil(height / TILE_SIZE)
-
-    os.makedirs(path.join(target_dir, "materials", "textures"), exist_ok=True)
-    os.makedirs(path.join(target_dir, "materials", "scripts"), exist_ok=True)
-
-    models = ""
-
-    for (x, y) in tqdm([(x,y) for x in range(width_num) for y in range(height_num)]):
-        surface = cairo.ImageSurface(cairo.FORMAT_RGB24, TILE_SIZE, TILE_SIZE)
-        ctx = cairo.Context(surface)
-
-        # fill black
-        ctx.set_source_rgb(0, 0, 0)
-        ctx.rectangle(0, 0, TILE_SIZE, TILE_SIZE)
-        ctx.fill()
+    bounding_box.x_min -= config.padding
+    bounding_box.y_min -= config.padding
+    bounding_box.x_max += config.padding
+    bounding_box.y_max += config.padding
+    return TileGrid(bounding_box, config.pixel_per_unit, config.tile_size)
+
+# state of a tile worker, set once per process by init_tile_worker
+_tile_plan = None
+_tile_tree = None
+_tile_grid = None
+_tile_target_dir = None
+_tile_config = None
+_tile_cache = None
+# 8-bit surface reused for all tiles of a process
+_tile_surface = None
+# one recording per plan item, replayed into the tiles it touches, None
+# draws tiles directly
+_tile_recordings = None
+# hashes of the tiles written by this process in the current run
+_tile_seen = set()
+# threads writing tile files while the next tile is drawn
+_tile_writer = None
+# taken by every queued write, bounds the tiles held in memory
+_tile_write_slots = None
+
+def init_tile_worker(plan, grid, target_dir, config):
+    global _tile_plan, _tile_tree, _tile_grid, _tile_target_dir
+    global _tile_config, _tile_cache, _tile_seen, _tile_writer, _tile_write_slots
+    global _tile_recordings
+    _tile_plan = plan
+    _tile_tree = STRtree([geometry for (geometry, _, _) in plan])
+    _tile_grid = grid
+    _tile_target_dir = target_dir
+    _tile_config = config
+    _tile_cache = None
+    if config.tile_cache is not None:
+        _tile_cache = tile_cache.TileCache(config.tile_cache, config.tile_cache_size)
+    _tile_seen = set()
+    if _tile_writer is not None:
+        _tile_writer.shutdown()
+    _tile_writer = ThreadPoolExecutor(config.writers)
+    _tile_write_slots = threading.BoundedSemaphore(2 * config.writers)
+    _tile_recordings = None
+    if config.recording:
+        _tile_recordings = record_plan(plan, grid)
+
+def write_file_atomic(file_name, write):
+    # tiles with equal content may be written by several workers at once
+    temp_name = "{0}.{1}.{2}.tmp".format(file_name, os.getpid(),
+        threading.get_ident())
+    result = write(temp_name)
+    os.replace(temp_name, file_name)
+    return result
 
+def hash_geometry(hasher, obj, origin=None):
+    """Feed everything that changes the drawing of obj to hasher. All arrays
+    are positions, with origin they are hashed relative to it."""
+    if isinstance(obj, np.ndarray):
+        if origin is not None:
+            # equal up to float noise of the subtraction
+            obj = np.round(obj - origin, GEOMETRY_DECIMALS) + 0.0
+        hasher.update(repr(obj.shape).encode())
+        hasher.update(np.ascontiguousarray(obj, dtype=float).tobytes())
+    elif isinstance(obj, BoundaryPiece):
+        # only what the piece draws, edits elsewhere in the run keep the key
+        # unless they shift its dashes
+        (begin, end) = obj.drawn_range()
+        hash_geometry(hasher, obj.run.points[begin:end + 1], origin)
+        hash_geometry(hasher, obj.run.line_marking)
+        if obj.run.line_marking == "dashed":
+            hash_geometry(hasher, round(obj.dash_offset(), GEOMETRY_DECIMALS))
+    elif isinstance(obj, scenario.Lanelet):
+        # ids and neighbours are not drawn
+        for value in (obj.left_boundary.points, obj.right_boundary.points,
+                obj.stop_line, obj.type):
+            hash_geometry(hasher, value, origin)
+    elif isinstance(obj, scenario.Obstacle):
+        hash_geometry(hasher, obj.type)
+        for rect in obj.shape.rectangles:
+            hash_geometry(hasher, (rect.length, rect.width, rect.orientation))
+            hash_geometry(hasher, rect.center, origin)
+        for circle in obj.shape.circles:
+            hash_geometry(hasher, circle.radius)
+            hash_geometry(hasher, circle.center, origin)
+        for polygon in obj.shape.polygons:
+            hash_geometry(hasher, polygon.points, origin)
+    else:
+        hasher.update(repr(obj).encode())
+    hasher.update(b";")
+
+def hash_items(hasher, items, origin=None):
+    for (_, draw_function, obj) in items:
+        hash_geometry(hasher, draw_function.__name__)
+        hash_geometry(hasher, obj, origin)
+
+def draw_mode(config):
+    return "recording" if config.recording else "direct"
+
+def tile_key(grid, x, y, items, fingerprint, mode):
+    """Cache key of a tile, computed before it is rendered. Entries store
+    the name of the tile, so the fingerprint naming it is part of the key,
+    and the pixels, which depend on the draw mode."""
+    hasher = hashlib.sha256()
+    (tile_x, tile_y, _, _) = grid.tile_box(x, y).bounds
+    hash_geometry(hasher, (TILE_CACHE_VERSION, grid.pixel_per_unit, grid.tile_size,
+        tile_x, tile_y, LINE_STYLES, fingerprint, mode))
+    hash_items(hasher, items)
+    return hasher.hexdigest()
+
+def geometry_fingerprint(grid, x, y, items, mode):
+    """Name a tile by what is drawn on it, relative to the tile, and how it
+    is drawn, so equal tiles anywhere in the world are only rendered once"""
+    hasher = hashlib.blake2b(digest_size=FINGERPRINT_DIGEST_SIZE)
+    (tile_x, tile_y, _, _) = grid.tile_box(x, y).bounds
+    hash_geometry(hasher, ("geometry", TILE_CACHE_VERSION, grid.pixel_per_unit,
+        grid.tile_size, LINE_STYLES, mode))
+    hash_items(hasher, items, np.array([tile_x, tile_y]))
+    return hasher.hexdigest()
+
+def pixel_fingerprint(data, algorithm):
+    if algorithm == "blake2b":
+        hasher = hashlib.blake2b(digest_size=FINGERPRINT_DIGEST_SIZE)
+    else:
+        hasher = hashlib.sha256()
+    hasher.update(data)
+    return hasher.hexdigest()
+
+def begin_tile(grid):
+    """Clear the surface of this process and return it with a context in
+    pixels, y pointing down. Only the alpha channel is stored, it becomes
+    the gray level of the texture."""
+    global _tile_surface
+    tile_size = grid.tile_size
+    if _tile_surface is None or _tile_surface.get_width() != tile_size:
+        _tile_surface = cairo.ImageSurface(cairo.FORMAT_A8, tile_size, tile_size)
+    surface = _tile_surface
+    ctx = cairo.Context(surface)
+
+    # clear to black
+    ctx.set_operator(cairo.OPERATOR_CLEAR)
+    ctx.paint()
+    ctx.set_operator(cairo.OPERATOR_OVER)
+    return (surface, ctx)
+
+def draw_tile(grid, x, y, items):
+    """Draw the items of a tile into the surface of this process"""
+    (surface, ctx) = begin_tile(grid)
+    tile_size = grid.tile_size
+    pixel_per_unit = grid.pixel_per_unit
+
+    # Inverse y-axis
+    ctx.translate(0, tile_size / 2)
+    ctx.scale(1, -1)
+    ctx.translate(0, -tile_size / 2)
+    ctx.scale(pixel_per_unit, pixel_per_unit)
+    ctx.translate(-grid.bounding_box.x_min, -grid.bounding_box.y_min)
+    ctx.translate(- x * tile_size / pixel_per_unit, - y * tile_size / pixel_per_unit)
+
+    ctx.set_source_rgb(1, 1, 1)
+    for (_, draw_function, obj) in join_pieces(items):
+        draw_function(ctx, obj)
+    surface.flush()
+    return surface
+
+def replay_tile(grid, x, y, indices):
+    """Paint the recordings of the plan items with the given indices into
+    the surface of this process"""
+    (surface, ctx) = begin_tile(grid)
+    # recordings are in pixels of the whole ground plane, y pointing down
+    # like in the tile, so tiles are just shifted by whole pixels
+    tile_size = grid.tile_size
+    ctx.translate(-x * tile_size, -(grid.height_num - 1 - y) * tile_size)
+    previous = None
+    for i in indices:
+        # pieces of a boundary run share the recording of the whole run
+        if _tile_recordings[i] is previous:
+            continue
+        previous = _tile_recordings[i]
+        ctx.set_source_surface(previous, 0, 0)
+        ctx.paint()
+    surface.flush()
+    return surface
+
+def record_plan(plan, grid):
+    """Draw every item of the plan once into its own recording surface.
+    Recordings are in pixels of the whole ground plane, so arcs are split
+    and tolerances applied as when drawing into a tile directly and tiles
+    only differ by whole pixels. Each recording is limited to the culling
+    box of its item, so painting it only touches the pixels it covers.
+    Boundary runs are recorded whole, recorded one by one their pieces
+    would paint their overlap twice."""
+    bounding_box = grid.bounding_box
+    pixel_per_unit = grid.pixel_per_unit
+    margin = grid.cull_margin()
+    # the upper border of the top row of tiles
+    height = grid.height_num * grid.tile_size
+    recordings = []
+    for (geometry, draw_function, obj) in plan:
+        if isinstance(obj, BoundaryPiece):
+            if obj.first > 0:
+                recordings.append(recordings[-1])
+                continue
+            obj = BoundaryPiece(obj.run, 0, len(obj.run.breaks) - 2)
+            geometry = LineString(obj.run.points)
+        (x_min, y_min, x_max, y_max) = geometry.bounds
+        left = math.floor((x_min - margin - bounding_box.x_min) * pixel_per_unit)
+        bottom = math.floor((y_min - margin - bounding_box.y_min) * pixel_per_unit)
+        right = math.ceil((x_max + margin - bounding_box.x_min) * pixel_per_unit)
+        top = math.ceil((y_max + margin - bounding_box.y_min) * pixel_per_unit)
+        recording = cairo.RecordingSurface(cairo.CONTENT_ALPHA,
+            (left, height - top, right - left, top - bottom))
+        ctx = cairo.Context(recording)
         # Inverse y-axis
-        ctx.translate(0, TILE_SIZE / 2)
+        ctx.translate(0, height)
         ctx.scale(1, -1)
-        ctx.translate(0, -TILE_SIZE / 2)
-
-        ctx.scale(PIXEL_PER_UNIT, PIXEL_PER_UNIT)
+        ctx.scale(pixel_per_unit, pixel_per_unit)
         ctx.translate(-bounding_box.x_min, -bounding_box.y_min)
-        ctx.translate(- x * TILE_SIZE / PIXEL_PER_UNIT, - y * TILE_SIZE / PIXEL_PER_UNIT)
-
         ctx.set_source_rgb(1, 1, 1)
-        for lanelet in doc.lanelet:
-            draw_stop_line(ctx, lanelet)
-            if lanelet.type == "zebraCrossing":
-                draw_zebra_crossing(ctx, lanelet)
-            #draw_boundary(ctx, lanelet.leftBoundary)
-            #draw_boundary(ctx, lanelet.rightBoundary)
-
-        draw_all_boundaries(ctx, doc.lanelet, "leftBoundary")
-        draw_all_boundaries(ctx, doc.lanelet, "rightBoundary")
-
-        for obstacle in doc.obstacle:
-            draw_obstacle(ctx, obstacle)
+        draw_function(ctx, obj)
+        recordings.append(recording)
+    return recordings
+
+def write_material(hash):
+    def write(file_name):
+        with open(file_name, "w") as file:
+            file.write(ground_plane_material("Tile/" + hash, "tile-{0}.png".format(hash)))
+    write_file_atomic(path.join(_tile_target_dir, "materials", "scripts",
+        "tile-{0}.material".format(hash)), write)
+
+@functools.lru_cache()
+def black_hash(size, algorithm):
+    return pixel_fingerprint(bytes(size), algorithm)
+
+def is_written(hash):
+    # another worker may have written it already
+    return hash in _tile_seen or path.exists(path.join(_tile_target_dir,
+        "materials", "textures", "tile-{0}.png".format(hash)))
+
+def write_texture_and_material(hash, write_texture):
+    """Returns (bytes written, seconds spent encoding)"""
+    texture = path.join(_tile_target_dir, "materials", "textures",
+        "tile-{0}.png".format(hash))
+    stats = (0, 0.0)
+    if not path.exists(texture):
+        stats = write_file_atomic(texture, write_texture)
+    write_material(hash)
+    return stats
+
+def write_tile_files(hash, write_texture):
+    """Queue writing texture and material of a tile unless a tile with the
+    same hash was already written in this run. Returns a future of the
+    write statistics or None."""
+    if hash in _tile_seen:
+        return None
+    _tile_seen.add(hash)
+    # blocks while the writers are behind
+    _tile_write_slots.acquire()
+    future = _tile_writer.submit(write_texture_and_material, hash, write_texture)
+    future.add_done_callback(lambda _: _tile_write_slots.release())
+    return future
+
+def encode_texture(data, stride):
+    def write(file_name):
+        tile_size = _tile_grid.tile_size
+        start = time.perf_counter()
+        encoded = png.encode_grayscale(data, tile_size, tile_size, stride,
+            _tile_config.compression)
+        encode_seconds = time.perf_counter() - start
+        with open(file_name, "wb") as file:
+            file.write(encoded)
+        return (len(encoded), encode_seconds)
+    return write
+
+def copy_cached(cached_texture):
+    def write(file_name):
+        tile_cache.link_or_copy(cached_texture, file_name)
+        return (0, 0.0)
+    return write
+
+def render_tile(tile):
+    """Render and hash one tile and queue writing it. Returns the hash,
+    whether the tile was taken from the cache, the cache key to add once
+    the tile is written and a future of the write statistics."""
+    (x, y) = tile
+    # only geometry touching the tile, in drawing order
+    visible = _tile_tree.query(_tile_grid.tile_box(x, y, _tile_grid.cull_margin()),
+        predicate="intersects")
+    indices = np.sort(visible)
+    items = [_tile_plan[i] for i in indices]
+    fingerprint = _tile_config.fingerprint
+    mode = draw_mode(_tile_config)
+
+    if fingerprint == "geometry":
+        hash = geometry_fingerprint(_tile_grid, x, y, items, mode)
+        if is_written(hash):
+            return (hash, False, None, None)
+
+    key = None
+    if _tile_cache is not None:
+        key = tile_key(_tile_grid, x, y, items, fingerprint, mode)
+        entry = _tile_cache.get(key)
+        if entry is not None:
+            (hash, cached_texture) = entry
+            return (hash, True, None,
+                write_tile_files(hash, copy_cached(cached_texture)))
+
+    if _tile_recordings is not None:
+        surface = replay_tile(_tile_grid, x, y, indices)
+    else:
+        surface = draw_tile(_tile_grid, x, y, items)
 
-        sha_256 = hashlib.sha256()
-        sha_256.update(surface.get_data())
-        hash = sha_256.hexdigest()
+    data = surface.get_data()
+    if fingerprint != "geometry":
+        # view of the surface memory, nothing is copied
+        if not np.frombuffer(data, dtype=np.uint8).any():
+            hash = black_hash(len(data), fingerprint)
+        else:
+            hash = pixel_fingerprint(data, fingerprint)
+
+    write = None
+    if hash not in _tile_seen:
+        # the surface is drawn over by the next tile, the writer gets a copy
+        write = write_tile_files(hash, encode_texture(bytes(data),
+            surface.get_stride()))
+    return (hash, False, key, write)
+
+def render_tile_batch(tiles):
+    """Render tiles while the previous ones are written, returns once all
+    files are written. Returns (hash, cached, bytes written, seconds spent
+    encoding) for each tile."""
+    rendered = [render_tile(tile) for tile in tiles]
+    results = []
+    for (hash, cached, key, write) in rendered:
+        (written, encode_seconds) = write.result() if write is not None else (0, 0.0)
+        if key is not None:
+            _tile_cache.put(key, hash, path.join(_tile_target_dir, "materials",
+                "textures", "tile-{0}.png".format(hash)))
+        results.append((hash, cached, written, encode_seconds))
+    return results
+
+def render_tiles(tiles, jobs, initargs):
+    """Yield the results of render_tile_batch for all tiles in order,
+    rendered by jobs processes"""
+    # small enough batches to keep all processes busy
+    batch_size = max(1, min(TILE_BATCH, len(tiles) // (4 * max(1, jobs))))
+    batches = [tiles[i:i + batch_size] for i in range(0, len(tiles), batch_size)]
+    if jobs <= 1:
+        init_tile_worker(*initargs)
+        for batch in batches:
+            yield from render_tile_batch(batch)
+        return
+    with Pool(jobs, initializer=init_tile_worker, initargs=initargs) as pool:
+        for results in pool.imap(render_tile_batch, batches):
+            yield from results
+
+def select_tiles(plan, grid, sparse):
+    tiles = grid.tiles()
+    if not sparse:
+        return tiles
+    # keep tiles that would have anything drawn on them
+    tree = STRtree([geometry for (geometry, _, _) in plan])
+    margin = grid.cull_margin()
+    return [(x, y) for (x, y) in tiles
+        if len(tree.query(grid.tile_box(x, y, margin), predicate="intersects")) > 0]
+
+def a8_stride(width):
+    # cairo aligns rows of A8 surfaces to 4 bytes
+    return (width + 3) // 4 * 4
+
+def estimate(doc, network, config):
+    """Size the ground plane of a render job without rendering it. Tiles
+    are told apart by their geometry fingerprint, so the unique tiles and
+    the bytes derived from them are upper bounds."""
+    grid = tile_grid(doc, config)
+    plan = plan_ground(doc, network)
+    tiles = select_tiles(plan, grid, config.sparse)
+    tree = STRtree([geometry for (geometry, _, _) in plan])
+    margin = grid.cull_margin()
+
+    names = set()
+    empty_name = None
+    for (x, y) in tiles:
+        visible = tree.query(grid.tile_box(x, y, margin), predicate="intersects")
+        items = [plan[i] for i in np.sort(visible)]
+        name = geometry_fingerprint(grid, x, y, items, draw_mode(config))
+        if len(items) == 0:
+            empty_name = name
+        names.add(name)
+
+    tile_size = grid.tile_size
+    stride = a8_stride(tile_size)
+    tile_pixels = tile_size * tile_size
+    max_png = png.max_encoded_size(tile_size, tile_size)
+    png_bytes = max_png * len(names)
+    if empty_name is not None:
+        # black tiles compress to almost nothing, encode one to know
+        png_bytes += len(png.encode_grayscale(bytes(stride * tile_size),
+            tile_size, tile_size, stride, config.compression)) - max_png
+
+    tile_bytes = stride * tile_size
+    # an encode holds the filtered rows and their copy, the compressed
+    # stream and the finished file
+    encode_bytes = 2 * tile_size * (tile_size + 1) + 2 * max_png
+    # every process draws into its surface while up to 2 * writers copies
+    # are queued or being encoded and one more waits for a slot
+    worker_bytes = (tile_bytes + (2 * config.writers + 1) * tile_bytes
+        + config.writers * encode_bytes)
+    if config.recording:
+        # cairo replays a recording into an image of at most a tile first
+        points = int(np.sum(shapely.count_coordinates(
+            [geometry for (geometry, _, _) in plan])))
+        worker_bytes += (tile_bytes + points * RECORDED_POINT_BYTES
+            + len(plan) * RECORDED_COMMAND_BYTES)
+    workers = max(1, min(config.jobs, len(tiles)))
+
+    return {
+        "tiles": len(tiles),
+        "tiles_total": grid.width_num * grid.height_num,
+        "unique_tiles": len(names),
+        "pixels": len(tiles) * tile_pixels,
+        "peak_memory": workers * worker_bytes,
+        "png_bytes": png_bytes,
+        # 8-bit textures with mipmaps, loaded once per unique tile
+        "texture_bytes": len(names) * tile_pixels * 4 // 3,
+    }
+
+def draw(doc, network, target_dir, config):
+    grid = tile_grid(doc, config)
+    bounding_box = grid.bounding_box
+    print(bounding_box)
+    tile_extent = grid.tile_extent
 
-        texture_file = "tile-{0}.png".format(hash)
-        material_file = "tile-{0}.material".format(hash)
-        surface.write_to_png(
-            path.join(target_dir, "materials", "textures", texture_file))
+    os.makedirs(path.join(target_dir, "materials", "textures"), exist_ok=True)
+    os.makedirs(path.join(target_dir, "materials", "scripts"), exist_ok=True)
 
-        with open(path.join(target_dir, "materials", "scripts", material_file), "w") as file:
-            file.write(ground_plane_material("Tile/" + hash, texture_file))
+    models = ""
 
+    # the plan is sent to every worker once, tiles only carry coordinates
+    plan = plan_ground(doc, network)
+    tiles = select_tiles(plan, grid, config.sparse)
+    results = render_tiles(tiles, config.jobs, (plan, grid, target_dir, config))
+
+    cache_hits = 0
+    hashes = set()
+    stats = []
+    for ((x, y), (hash, cached, written, encode_seconds)) in zip(tiles,
+            tqdm(results, total=len(tiles))):
+        cache_hits += cached
+        hashes.add(hash)
+        stats.append((x, y, hash, int(cached), written, encode_seconds))
         models += ground_plane_model(
-            bounding_box.x_min + (x + 0.5) * TILE_SIZE / PIXEL_PER_UNIT,
-            bounding_box.y_min + (y + 0.5) * TILE_SIZE / PIXEL_PER_UNIT,
-            TILE_SIZE / PIXEL_PER_UNIT,
+            bounding_box.x_min + (x + 0.5) * grid.tile_size / grid.pixel_per_unit,
+            bounding_box.y_min + (y + 0.5) * grid.tile_size / grid.pixel_per_unit,
+            tile_extent,
             "Tile/{0}-{1}".format(x, y),
             "Tile/" + hash)
 
+    print("{0} tiles, {1} unique".format(len(tiles), len(hashes)))
+    encoded = [row for row in stats if row[4] > 0]
+    if len(encoded) > 0:
+        print("Wrote {0} bytes in {1} textures, {2:.1f} ms encoding per texture".format(
+            sum(row[4] for row in encoded), len(encoded),
+            1000 * sum(row[5] for row in encoded) / len(encoded)))
+    if config.tile_stats is not None:
+        with open(config.tile_stats, "w", newline="") as file:
+            stats_writer = csv.writer(file)
+            stats_writer.writerow(["x", "y", "hash", "cached", "bytes", "encode_seconds"])
+            stats_writer.writerows(stats)
+    if config.tile_cache is not None:
+        cache = tile_cache.TileCache(config.tile_cache, config.tile_cache_size)
+        removed = cache.evict()
+        print("Tile cache: {0} of {1} tiles reused, {2} entries evicted".format(
+            cache_hits, len(tiles), removed))
+
+    if config.sparse:
+        print("Rendered {0} of {1} tiles".format(len(tiles),
+            grid.width_num * grid.height_num))
+        if config.empty_ground == "plane":
+            # one black plane below the tiles covers all skipped ones
+            width = grid.width_num * tile_extent
+            height = grid.height_num * tile_extent
+            models += empty_ground_model(
+                bounding_box.x_min + width / 2, bounding_box.y_min + height / 2,
+                width, height)
+
     return models
 
+def empty_ground_model(x, y, width, height):
+    return """
+    <model name='Ground'>
+      <static>1</static>
+      <link name='link'>
+        <collision name='collision'>
+          <geometry>
+            <plane>
+              <normal>0 0 1</normal>
+              <size>{width} {height}</size>
+            </plane>
+          </geometry>
+          <surface>
+            <friction>
+              <ode>
+                <mu>100</mu>
+                <mu2>50</mu2>
+              </ode>
+            </friction>
+          </surface>
+        </collision>
+        <visual name='visual'>
+          <cast_shadows>0</cast_shadows>
+          <geometry>
+            <plane>
+              <normal>0 0 1</normal>
+              <size>{width} {height}</size>
+            </plane>
+          </geometry>
+          <material>
+            <script>
+              <name>Gazebo/Black</name>
+              <uri>file://media/materials/scripts/gazebo.material</uri>
+            </script>
+          </material>
+        </visual>
+      </link>
+      <pose frame=''>{x} {y} -0.001 0 -0 0</pose>
+    </model>
+    """.format(x=x, y=y, width=width, height=height)
+
 def ground_plane_material(name, file):
     return """
     material {name}
@@ -1,9 +1,9 @@
 def draw(obst):
     result = ""
     i = 0
-    for rect in obst.shape.rectangle:
+    for rect in obst.shape.rectangles:
         result += obstacle_model("Obstacle/{0}/{1}".format(obst.id, i),
-            rect.centerPoint.x, rect.centerPoint.y, rect.length,
+            rect.center[0], rect.center[1], rect.length,
             rect.width, 0.2, - rect.orientation)
         i += 1
     return result
@@ -0,0 +1,32 @@
+"""Minimal PNG encoder for 8-bit grayscale images
+
+cairo writes PNGs in the color type of the surface and offers no control over
+the encoder, this writes single-channel PNGs straight from an A8 buffer.
+"""
+import struct, zlib
+import numpy as np
+
+SIGNATURE = b"\x89PNG\r\n\x1a\n"
+DEFAULT_COMPRESSION = 6
+
+def chunk(type, data):
+    return (struct.pack(">I", len(data)) + type + data +
+        struct.pack(">I", zlib.crc32(type + data)))
+
+def encode_grayscale(data, width, height, stride, level=DEFAULT_COMPRESSION):
+    """Encode rows of width bytes, stride bytes apart, as PNG"""
+    rows = np.frombuffer(data, dtype=np.uint8, count=stride * height).reshape(height, stride)
+    # every row starts with filter type 0 (none)
+    raw = np.zeros((height, width + 1), dtype=np.uint8)
+    raw[:,1:] = rows[:,:width]
+    header = struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)
+    return (SIGNATURE + chunk(b"IHDR", header) +
+        chunk(b"IDAT", zlib.compress(raw.tobytes(), level)) + chunk(b"IEND", b""))
+
+def max_encoded_size(width, height):
+    """Upper bound of the size of encode_grayscale's output"""
+    raw = height * (width + 1)
+    # compressBound of zlib
+    deflate = raw + (raw >> 12) + (raw >> 14) + (raw >> 25) + 13
+    # signature, three chunks of 12 bytes and the header
+    return len(SIGNATURE) + 3 * 12 + 13 + deflate
@@ -1,16 +1,23 @@
 from commonroad.renderer import groundplane, obstacle, traffic_sign, ego_vehicle
-from commonroad import schema
+from commonroad import reader
+from commonroad.lanelet_network import LaneletNetwork
+from commonroad.renderer.config import RenderConfig
 from os import path
 
-def generate_sdf(xml_content, target_dir):
-    doc = schema.CreateFromDocument(xml_content)
+def generate_sdf(source, target_dir, config=None):
+    if config is None:
+        config = RenderConfig()
 
-    content = groundplane.draw(doc, target_dir)
-    content += ego_vehicle.draw(target_dir, doc.lanelet)
-    for obst in doc.obstacle:
+    doc = reader.read_scenario(source)
+
+    network = LaneletNetwork(doc.lanelets)
+
+    content = groundplane.draw(doc, network, target_dir, config)
+    content += ego_vehicle.draw(target_dir, network)
+    for obst in doc.obstacles:
         if obst.type != "blockedArea":
             content += obstacle.draw(obst)
-    for sign in doc.trafficSign:
+    for sign in doc.traffic_signs:
         content += traffic_sign.draw(sign, target_dir)
 
     with open(path.join(target_dir, "world.sdf"), "w") as file:
@@ -19,6 +26,22 @@ def generate_sdf(xml_content, target_dir):
         file.write(content)
         file.write("</world></sdf>")
 
+def print_render_plan(source, config=None):
+    """Print the size of the ground plane that generate_sdf would render"""
+    if config is None:
+        config = RenderConfig()
+
+    doc = reader.read_scenario(source)
+    network = LaneletNetwork(doc.lanelets)
+
+    plan = groundplane.estimate(doc, network, config)
+    print("Tiles: {0} of {1}, at most {2} unique".format(
+        plan["tiles"], plan["tiles_total"], plan["unique_tiles"]))
+    print("Pixels: {0}".format(plan["pixels"]))
+    print("Peak memory: {0} bytes".format(plan["peak_memory"]))
+    print("PNG bytes: at most {0}".format(plan["png_bytes"]))
+    print("Texture bytes: at most {0}".format(plan["texture_bytes"]))
+
 def sun_light():
     return """
     <light name='sun_light' type='directional'>
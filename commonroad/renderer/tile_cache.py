@@ -0,0 +1,74 @@
+"""Persistent cache of rendered ground plane tiles
+
+Entries are addressed by a key computed from everything that is drawn on a
+tile, so a tile can be looked up before it is rendered. Each entry stores
+the texture and the hash of its pixels, which names the texture in the
+world. The modification time of an entry is its last use, the least
+recently used entries are removed once the cache grows beyond its size.
+"""
+import os, shutil
+
+DEFAULT_MAX_SIZE = 1024 * 1024 * 1024
+
+def link_or_copy(source, target):
+    try:
+        os.link(source, target)
+    except OSError:
+        # other file system or no hard links available
+        shutil.copyfile(source, target)
+
+class TileCache:
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key, extension):
+        return os.path.join(self.directory, key + extension)
+
+    def get(self, key):
+        """Returns (hash, texture file) of the entry or None"""
+        texture = self._path(key, ".png")
+        try:
+            with open(self._path(key, ".hash")) as file:
+                hash = file.read()
+            os.utime(texture)
+        except OSError:
+            return None
+        return (hash, texture)
+
+    def put(self, key, hash, texture):
+        """Add a rendered texture, several processes may add the same key"""
+        temp_name = "{0}.{1}.tmp".format(key, os.getpid())
+        temp_texture = self._path(temp_name, ".png")
+        link_or_copy(texture, temp_texture)
+        os.replace(temp_texture, self._path(key, ".png"))
+        # written last, an entry is only found once it is complete
+        temp_hash = self._path(temp_name, ".hash")
+        with open(temp_hash, "w") as file:
+            file.write(hash)
+        os.replace(temp_hash, self._path(key, ".hash"))
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits max_size"""
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(".png"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.name[:-4]))
+                    total += stat.st_size
+        entries.sort()
+        removed = 0
+        for (_, size, key) in entries:
+            if total <= self.max_size:
+                break
+            for extension in (".hash", ".png"):
+                try:
+                    os.remove(self._path(key, extension))
+                except FileNotFoundError:
+                    pass
+            total -= size
+            removed += 1
+        return removed
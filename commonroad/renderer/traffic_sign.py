@@ -28,7 +28,7 @@ def draw(sign, target_dir):
 
     size = ALL_SIZES.get(sign.type, DEFAULT_SIZE)
 
-    return model(sign.centerPoint.x, sign.centerPoint.y, HEIGHT + size["h"]/2, sign.orientation + math.pi/2,
+    return model(sign.center[0], sign.center[1], HEIGHT + size["h"]/2, sign.orientation + math.pi/2,
         "Sign/{0}".format(sign.id), "Sign/{0}".format(sign.type), size["w"], size["h"])
 
 def material(name, file):
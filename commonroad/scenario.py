@@ -0,0 +1,104 @@
+"""Lightweight scenario model
+
+PyXB validates and allocates on every attribute assignment, which makes
+building large documents slow. These classes keep all coordinates in NumPy
+arrays; commonroad.writer writes them as XML and commonroad.reader reads
+them back.
+"""
+import numpy as np
+
+class Boundary:
+    __slots__ = ("points", "line_marking")
+
+    def __init__(self, points, line_marking=None):
+        # (N,2) array, may be shared with other boundaries and is never
+        # changed in place
+        self.points = np.asarray(points, dtype=float).reshape(-1, 2)
+        self.line_marking = line_marking
+
+class Lanelet:
+    __slots__ = ("id", "left_boundary", "right_boundary", "type", "is_start",
+        "stop_line", "predecessors", "successors", "adjacent_left",
+        "adjacent_left_dir", "adjacent_right", "adjacent_right_dir")
+
+    def __init__(self, left_boundary, right_boundary, type=None,
+            is_start=False, stop_line=None):
+        self.id = None
+        self.left_boundary = left_boundary
+        self.right_boundary = right_boundary
+        self.type = type
+        self.is_start = is_start
+        self.stop_line = stop_line
+        # lists of lanelet ids, None omits the element
+        self.predecessors = None
+        self.successors = None
+        self.adjacent_left = None
+        self.adjacent_left_dir = None
+        self.adjacent_right = None
+        self.adjacent_right_dir = None
+
+class Rectangle:
+    __slots__ = ("length", "width", "orientation", "center")
+
+    def __init__(self, length, width, orientation, center):
+        self.length = length
+        self.width = width
+        self.orientation = orientation
+        self.center = np.asarray(center, dtype=float)
+
+class Circle:
+    __slots__ = ("radius", "center")
+
+    def __init__(self, radius, center):
+        self.radius = radius
+        self.center = np.asarray(center, dtype=float)
+
+class Polygon:
+    __slots__ = ("points",)
+
+    def __init__(self, points):
+        self.points = np.asarray(points, dtype=float).reshape(-1, 2)
+
+class Shape:
+    __slots__ = ("rectangles", "circles", "polygons")
+
+    def __init__(self, rectangles=None, circles=None, polygons=None):
+        self.rectangles = rectangles if rectangles is not None else []
+        self.circles = circles if circles is not None else []
+        self.polygons = polygons if polygons is not None else []
+
+class Obstacle:
+    __slots__ = ("id", "role", "type", "shape")
+
+    def __init__(self, role, type, shape):
+        self.id = None
+        self.role = role
+        self.type = type
+        self.shape = shape
+
+class TrafficSign:
+    __slots__ = ("id", "type", "orientation", "center")
+
+    def __init__(self, type, orientation, center):
+        self.id = None
+        self.type = type
+        self.orientation = orientation
+        self.center = np.asarray(center, dtype=float)
+
+class Scenario:
+    __slots__ = ("lanelets", "obstacles", "traffic_signs")
+
+    def __init__(self):
+        self.lanelets = []
+        self.obstacles = []
+        self.traffic_signs = []
+
+    def append(self, obj):
+        if isinstance(obj, Lanelet):
+            self.lanelets.append(obj)
+        elif isinstance(obj, Obstacle):
+            self.obstacles.append(obj)
+        elif isinstance(obj, TrafficSign):
+            self.traffic_signs.append(obj)
+        else:
+            raise TypeError("unknown scenario object {}".format(obj))
@@ -1,5 +1,7 @@
-from commonroad import schema
+from commonroad import scenario
 from functools import reduce
+import math
+import numpy as np
 
 class BoundingBox:
     def __init__(self, x_min, y_min, x_max, y_max):
@@ -19,41 +21,43 @@ class BoundingBox:
         return "BoundingBox({0}, {1}, {2}, {3})".format(self.x_min, self.y_min,
             self.x_max, self.y_max)
 
+def points_bounding_box(points):
+    (x_min, y_min) = np.min(points, axis=0).tolist()
+    (x_max, y_max) = np.max(points, axis=0).tolist()
+    return BoundingBox(x_min, y_min, x_max, y_max)
+
 def get_bounding_box(object):
-    if isinstance(object, schema.boundary):
-        all_x = list(map(lambda p: p.x, object.point))
-        all_y = list(map(lambda p: p.y, object.point))
-        return BoundingBox(min(all_x), min(all_y), max(all_x), max(all_y))
-    elif isinstance(object, schema.lanelet):
-        left = get_bounding_box(object.leftBoundary)
-        right = get_bounding_box(object.rightBoundary)
+    if isinstance(object, scenario.Boundary):
+        return points_bounding_box(object.points)
+    elif isinstance(object, scenario.Lanelet):
+        left = get_bounding_box(object.left_boundary)
+        right = get_bounding_box(object.right_boundary)
         return left.union(right)
-    elif isinstance(object, schema.rectangle):
+    elif isinstance(object, scenario.Rectangle):
         radius = math.sqrt((object.width/2)**2 + (object.length/2)**2)
         return BoundingBox(
-            object.centerPoint.x - radius,
-            object.centerPoint.y - radius,
-            object.centerPoint.x + radius,
-            object.centerPoint.y + radius)
-    elif isinstance(object, schema.circle):
+            object.center[0] - radius,
+            object.center[1] - radius,
+            object.center[0] + radius,
+            object.center[1] + radius)
+    elif isinstance(object, scenario.Circle):
         return BoundingBox(
-            object.centerPoint.x - radius,
-            object.centerPoint.y - radius,
-            object.centerPoint.x + radius,
-            object.centerPoint.y + radius)
-    elif isinstance(object, schema.polygon):
-        all_x = list(map(lambda p: p.x, object.point))
-        all_y = list(map(lambda p: p.y, object.point))
-        return BoundingBox(min(all_x), min(all_y), max(all_x), max(all_y))
-    elif isinstance(object, schema.shape):
-        # TODO
-        raise NotImplementedError()
-    elif isinstance(object, schema.obstacle):
-        # TODO
-        raise NotImplementedError()
-    elif isinstance(object, schema.CommonRoad):
+            object.center[0] - object.radius,
+            object.center[1] - object.radius,
+            object.center[0] + object.radius,
+            object.center[1] + object.radius)
+    elif isinstance(object, scenario.Polygon):
+        return points_bounding_box(object.points)
+    elif isinstance(object, scenario.Shape):
         return reduce(
             lambda x,y: x.union(y),
-            map(lambda l: get_bounding_box(l), object.lanelet))
+            map(get_bounding_box, object.rectangles + object.circles + object.polygons))
+    elif isinstance(object, scenario.Obstacle):
+        return get_bounding_box(object.shape)
+    elif isinstance(object, scenario.Scenario):
+        # all lanelet points at once instead of one box per lanelet
+        return points_bounding_box(np.concatenate(
+            [l.left_boundary.points for l in object.lanelets] +
+            [l.right_boundary.points for l in object.lanelets]))
     else:
         raise NotImplementedError()
@@ -0,0 +1,112 @@
+"""Streaming CommonRoad XML writer
+
+Writes scenario objects directly to a file as they are exported instead of
+building a PyXB document and serializing it with toxml(). The root element
+allows obstacles, lanelets and traffic signs in any order, so every object
+can be written as soon as its ids are known.
+"""
+from commonroad import scenario
+
+# str() of a float is the shortest repr that round-trips, same as PyXB
+FLOAT_FORMAT = "{}"
+
+class ScenarioWriter:
+    def __init__(self, file, float_format=FLOAT_FORMAT):
+        self._file = file
+        self._format = float_format.format
+
+    def __enter__(self):
+        self.begin()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.end()
+
+    def begin(self):
+        self._file.write('<?xml version="1.0" ?><commonRoad commonRoadVersion="1.0">')
+
+    def end(self):
+        self._file.write("</commonRoad>\n")
+        self._file.flush()
+
+    def write(self, obj):
+        if isinstance(obj, scenario.Lanelet):
+            self.write_lanelet(obj)
+        elif isinstance(obj, scenario.Obstacle):
+            self.write_obstacle(obj)
+        elif isinstance(obj, scenario.TrafficSign):
+            self.write_traffic_sign(obj)
+        else:
+            raise TypeError("unknown scenario object {}".format(obj))
+
+    def _float(self, value):
+        return self._format(float(value))
+
+    def _points(self, points, tag="point"):
+        fmt = self._format
+        return "".join("<{0}><x>{1}</x><y>{2}</y></{0}>".format(tag, fmt(x), fmt(y))
+            for (x, y) in points.tolist())
+
+    def _boundary(self, boundary, tag):
+        out = "<{0}>".format(tag) + self._points(boundary.points)
+        if boundary.line_marking is not None:
+            out += "<lineMarking>{0}</lineMarking>".format(boundary.line_marking)
+        return out + "</{0}>".format(tag)
+
+    def _ref_list(self, ids, tag):
+        if len(ids) == 0:
+            return "<{0}/>".format(tag)
+        return "<{0}>{1}</{0}>".format(tag,
+            "".join('<lanelet ref="{0}"/>'.format(id) for id in ids))
+
+    def write_lanelet(self, lanelet):
+        # child order is fixed by the schema
+        out = ['<lanelet id="{0}">'.format(lanelet.id)]
+        if lanelet.type is not None:
+            out.append("<type>{0}</type>".format(lanelet.type))
+        if lanelet.is_start:
+            out.append("<isStart>true</isStart>")
+        out.append(self._boundary(lanelet.left_boundary, "leftBoundary"))
+        out.append(self._boundary(lanelet.right_boundary, "rightBoundary"))
+        if lanelet.predecessors is not None:
+            out.append(self._ref_list(lanelet.predecessors, "predecessor"))
+        if lanelet.successors is not None:
+            out.append(self._ref_list(lanelet.successors, "successor"))
+        if lanelet.adjacent_left is not None:
+            out.append('<adjacentLeft ref="{0}" drivingDir="{1}"/>'.format(
+                lanelet.adjacent_left, lanelet.adjacent_left_dir))
+        if lanelet.adjacent_right is not None:
+            out.append('<adjacentRight ref="{0}" drivingDir="{1}"/>'.format(
+                lanelet.adjacent_right, lanelet.adjacent_right_dir))
+        if lanelet.stop_line is not None:
+            out.append("<stopLine>{0}</stopLine>".format(lanelet.stop_line))
+        out.append("</lanelet>")
+        self._file.write("".join(out))
+
+    def _shape(self, shape):
+        out = ["<shape>"]
+        for rect in shape.rectangles:
+            out.append("<rectangle><length>{0}</length><width>{1}</width>"
+                "<orientation>{2}</orientation>".format(self._float(rect.length),
+                self._float(rect.width), self._float(rect.orientation)))
+            out.append(self._points(rect.center.reshape(1, 2), "centerPoint"))
+            out.append("</rectangle>")
+        for circle in shape.circles:
+            out.append("<circle><radius>{0}</radius>".format(self._float(circle.radius)))
+            out.append(self._points(circle.center.reshape(1, 2), "centerPoint"))
+            out.append("</circle>")
+        for polygon in shape.polygons:
+            out.append("<polygon>" + self._points(polygon.points) + "</polygon>")
+        out.append("</shape>")
+        return "".join(out)
+
+    def write_obstacle(self, obstacle):
+        self._file.write('<obstacle id="{0}"><role>{1}</role><type>{2}</type>{3}</obstacle>'.format(
+            obstacle.id, obstacle.role, obstacle.type, self._shape(obstacle.shape)))
+
+    def write_traffic_sign(self, sign):
+        self._file.write('<trafficSign id="{0}"><type>{1}</type>'
+            '<orientation>{2}</orientation>{3}</trafficSign>'.format(
+            sign.id, sign.type, self._float(sign.orientation),
+            self._points(sign.center.reshape(1, 2), "centerPoint")))
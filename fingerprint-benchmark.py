@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Compare the cost of the tile fingerprints of gazebo-renderer
+
+Every tile of the ground plane is rendered once, then each fingerprint is
+computed for all tiles and the time per tile is printed. Geometry
+fingerprints do not need the rendered tile, rendering is listed for
+comparison.
+"""
+from commonroad import reader
+from commonroad.lanelet_network import LaneletNetwork
+from commonroad.renderer import groundplane
+from commonroad.renderer.config import RenderConfig
+import numpy as np
+import argparse, math, sys, tempfile, time
+
+def time_per_tile(function, tiles, repeat):
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for tile in tiles:
+            function(tile)
+        best = min(best, time.perf_counter() - start)
+    return best / len(tiles)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark tile fingerprints on a CommonRoad XML file")
+    parser.add_argument("input", nargs="?", type=argparse.FileType("rb"),
+        default=sys.stdin.buffer)
+    parser.add_argument("--repeat", "-r", type=int, default=3,
+        help="runs per fingerprint, the fastest is reported")
+    args = parser.parse_args()
+
+    with args.input as input_file:
+        doc = reader.read_scenario(input_file)
+    network = LaneletNetwork(doc.lanelets)
+
+    config = RenderConfig()
+    grid = groundplane.tile_grid(doc, config)
+
+    plan = groundplane.plan_ground(doc, network)
+    tiles = groundplane.select_tiles(plan, grid, False)
+    groundplane.init_tile_worker(plan, grid, tempfile.mkdtemp(), config)
+
+    def visible_items(tile):
+        (x, y) = tile
+        visible = groundplane._tile_tree.query(grid.tile_box(x, y,
+            grid.cull_margin()), predicate="intersects")
+        return [plan[i] for i in np.sort(visible)]
+    items = {tile: visible_items(tile) for tile in tiles}
+
+    def render(tile):
+        (x, y) = tile
+        surface = groundplane.draw_tile(grid, x, y, items[tile])
+        return bytes(surface.get_data())
+    pixels = {tile: render(tile) for tile in tiles}
+
+    results = [
+        ("render", time_per_tile(render, tiles, args.repeat)),
+        ("sha256", time_per_tile(lambda tile: groundplane.pixel_fingerprint(
+            pixels[tile], "sha256"), tiles, args.repeat)),
+        ("blake2b", time_per_tile(lambda tile: groundplane.pixel_fingerprint(
+            pixels[tile], "blake2b"), tiles, args.repeat)),
+        ("black check", time_per_tile(lambda tile: np.frombuffer(
+            pixels[tile], dtype=np.uint8).any(), tiles, args.repeat)),
+        ("geometry", time_per_tile(lambda tile: groundplane.geometry_fingerprint(
+            grid, tile[0], tile[1], items[tile], groundplane.draw_mode(config)),
+            tiles, args.repeat)),
+    ]
+
+    print("{0} tiles of {1}x{1} pixels".format(len(tiles), grid.tile_size))
+    for (name, seconds) in results:
+        print("{0:<12} {1:10.3f} ms/tile".format(name, seconds * 1000))
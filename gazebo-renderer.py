@@ -1,23 +1,71 @@
 #!/usr/bin/env python3
 from commonroad.renderer import sdf
+from commonroad.renderer.config import RenderConfig
+from commonroad.renderer.groundplane import PIXEL_PER_UNIT, TILE_SIZE, PADDING
+from commonroad.renderer.png import DEFAULT_COMPRESSION
 import argparse, sys, os
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description="Generate Gazebo SDF files from CommonRoad XML")
-    parser.add_argument("input", nargs="?", type=argparse.FileType("r"),
-        default=sys.stdin)
-    parser.add_argument("--output", "-o", required=True)
+    parser.add_argument("input", nargs="?", type=argparse.FileType("rb"),
+        default=sys.stdin.buffer)
+    parser.add_argument("--output", "-o")
     parser.add_argument("--force", "-f", action="store_true")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count(),
+        help="number of processes rendering ground plane tiles")
+    parser.add_argument("--sparse", action="store_true",
+        help="only render ground plane tiles that contain road markings")
+    parser.add_argument("--empty-ground", choices=["plane", "none"],
+        default="plane", help="ground below skipped tiles in sparse mode")
+    parser.add_argument("--tile-cache",
+        help="directory to reuse rendered tiles from across runs")
+    parser.add_argument("--tile-cache-size", type=int, default=1024,
+        help="maximum size of the tile cache in MiB")
+    parser.add_argument("--fingerprint", default="sha256",
+        choices=["sha256", "blake2b", "geometry"],
+        help="name tiles by a hash of their pixels or of the geometry drawn "
+        "on them, geometry skips rendering repeated tiles")
+    parser.add_argument("--pixel-per-unit", type=float, default=PIXEL_PER_UNIT,
+        help="texture resolution of the ground plane in pixels per meter")
+    parser.add_argument("--tile-size", type=int, default=TILE_SIZE,
+        help="width and height of a ground plane tile in pixels")
+    parser.add_argument("--padding", type=float, default=PADDING,
+        help="ground plane around the road in meters")
+    parser.add_argument("--compression", type=int, choices=range(10),
+        default=DEFAULT_COMPRESSION, metavar="0-9",
+        help="zlib level of the tile textures, 1 is fastest")
+    parser.add_argument("--writers", type=int, default=2,
+        help="threads per process encoding and writing tiles")
+    parser.add_argument("--tile-stats",
+        help="CSV file to write bytes and encode time of every tile to")
+    parser.add_argument("--recording", action="store_true",
+        help="draw the road markings once into cairo recordings and replay "
+        "them into every tile they touch")
+    parser.add_argument("--plan", action="store_true",
+        help="print the number of tiles and the memory and bytes needed to "
+        "render them, without rendering")
     args = parser.parse_args()
 
+    config = RenderConfig(jobs=args.jobs, sparse=args.sparse,
+        empty_ground=args.empty_ground, tile_cache=args.tile_cache,
+        tile_cache_size=args.tile_cache_size * 1024 * 1024,
+        fingerprint=args.fingerprint, pixel_per_unit=args.pixel_per_unit,
+        tile_size=args.tile_size, padding=args.padding,
+        compression=args.compression, writers=args.writers,
+        tile_stats=args.tile_stats, recording=args.recording)
+
+    if args.plan:
+        with args.input as input_file:
+            sdf.print_render_plan(input_file, config)
+        sys.exit(0)
+    if args.output is None:
+        parser.error("the following arguments are required: --output/-o")
+
     os.makedirs(args.output, exist_ok=True)
     if os.listdir(args.output) != [] and not args.force:
         print("Output directory is not empty.")
         print("Use --force")
         sys.exit(1)
-
     with args.input as input_file:
-        xml = input_file.read()
-
-    sdf.generate_sdf(xml, args.output)
+        sdf.generate_sdf(input_file, args.output, config)
@@ -1,13 +1,21 @@
 #!/usr/bin/env python3
-import sys, argparse
-from commonroad import schema
+import sys, os, argparse, time
+from multiprocessing import Pool
+from commonroad import schema, writer
 from commonroad.generator import road_generation, preset_parser
 import pkg_resources
 from lxml import etree
+from tqdm import tqdm
 
 SCHEMA = etree.XMLSchema(etree.parse(pkg_resources.resource_stream(
     "commonroad.generator", "template-schema.xsd")))
 
+def positive_float(value):
+    number = float(value)
+    if not number > 0:
+        raise argparse.ArgumentTypeError("must be greater than 0: {}".format(value))
+    return number
+
 class Config:
     def __init__(self):
         self.road_width = 0.4
@@ -19,47 +27,124 @@ def main():
         default=sys.stdin)
     parser.add_argument("--output", "-o", type=argparse.FileType("w"),
         default=sys.stdout)
+    parser.add_argument("--count", "-n", type=int, default=None,
+        help="generate N scenarios in batch mode (requires --out-dir)")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count(),
+        help="number of worker processes in batch mode")
+    parser.add_argument("--out-dir", "-d",
+        help="output directory for batch mode")
+    parser.add_argument("--stats", action="store_true",
+        help="print road placement statistics to stderr")
+    parser.add_argument("--max-chord-error", type=positive_float,
+        help="maximum distance between sampled polylines and curves")
+    parser.add_argument("--max-segment-length", type=positive_float,
+        help="maximum segment length of sampled polylines")
+    parser.add_argument("--float-format", default=writer.FLOAT_FORMAT,
+        help="format string for coordinates in the output, e.g. {:.6f}")
     args = parser.parse_args()
 
+    if args.count is not None and args.out_dir is None:
+        parser.error("--count requires --out-dir")
+
     parser = etree.XMLParser(schema=SCHEMA)
-    root = etree.parse(args.input, parser)
+    with args.input as input_file:
+        root = etree.parse(input_file, parser)
+
+    sampling = preset_parser.get_sampling(root, args.max_chord_error,
+        args.max_segment_length)
+
+    if args.count is not None:
+        generate_batch(root, sampling, args.count, args.jobs, args.out_dir,
+            args.float_format, args.stats)
+        return
 
-    primitives = road_generation.generate(root)
+    stats = road_generation.GenerationStats()
+    with args.output as file:
+        write_document(root, file, sampling, stats, args.float_format)
+
+    if args.stats:
+        print(stats, file=sys.stderr)
 
-    doc = schema.commonRoad()
-    doc.commonRoadVersion = "1.0"
-    #doc.append(ego_vehicle())
+def export_primitives(primitives):
+    """Yield the scenario objects of all primitives with ids and lanelet
+    adjacency assigned. The objects of a primitive are held back until the
+    next one is exported because their successors are not known before."""
     id = 0
-    lanelet_pairs = []
+    pending = []
+    last_pair = None
     for p in primitives:
         export = p.export(Config())
-        lanelet_pairs += export.lanelet_pairs
         for obj in export.objects:
             id -= 1
             obj.id = id
-            doc.append(obj)
-
-    # adjacents
-    for pair in lanelet_pairs:
-        pair[0].adjacentLeft = schema.laneletAdjacentRef(ref=pair[1].id, drivingDir="opposite")
-        pair[1].adjacentLeft = schema.laneletAdjacentRef(ref=pair[0].id, drivingDir="opposite")
-        pair[0].successor = schema.laneletRefList()
-        pair[0].predecessor = schema.laneletRefList()
-        pair[1].successor = schema.laneletRefList()
-        pair[1].predecessor = schema.laneletRefList()
-
-    # right lanes
-    for i in range(len(lanelet_pairs)-1):
-        lanelet_pairs[i][0].successor.lanelet.append(schema.laneletRef(ref=lanelet_pairs[i+1][0].id))
-        lanelet_pairs[i+1][0].predecessor.lanelet.append(schema.laneletRef(ref=lanelet_pairs[i][0].id))
-
-    # left lanes
-    for i in range(len(lanelet_pairs)-1, 0, -1):
-        lanelet_pairs[i][1].successor.lanelet.append(schema.laneletRef(ref=lanelet_pairs[i-1][1].id))
-        lanelet_pairs[i-1][1].predecessor.lanelet.append(schema.laneletRef(ref=lanelet_pairs[i][1].id))
 
-    with args.output as file:
-        file.write(doc.toxml())
+        for pair in export.lanelet_pairs:
+            pair[0].adjacent_left = pair[1].id
+            pair[0].adjacent_left_dir = "opposite"
+            pair[1].adjacent_left = pair[0].id
+            pair[1].adjacent_left_dir = "opposite"
+            pair[0].successors = []
+            pair[0].predecessors = []
+            pair[1].successors = []
+            pair[1].predecessors = []
+            if last_pair is not None:
+                # right lanes drive forward, left lanes backward
+                last_pair[0].successors.append(pair[0].id)
+                pair[0].predecessors.append(last_pair[0].id)
+                pair[1].successors.append(last_pair[1].id)
+                last_pair[1].predecessors.append(pair[1].id)
+            last_pair = pair
+
+        yield from pending
+        pending = export.objects
+    yield from pending
+
+def write_document(root, file, sampling=None, stats=None,
+        float_format=writer.FLOAT_FORMAT):
+    primitives = road_generation.generate(root, stats, sampling)
+
+    with writer.ScenarioWriter(file, float_format) as out:
+        for obj in export_primitives(primitives):
+            out.write(obj)
+
+# preset shared by all batch workers, parsed once per worker process
+_batch_root = None
+_batch_sampling = None
+_batch_float_format = None
+
+def init_batch_worker(preset_xml, sampling, float_format):
+    global _batch_root, _batch_sampling, _batch_float_format
+    # already validated by the parent process
+    _batch_root = etree.ElementTree(etree.fromstring(preset_xml))
+    _batch_sampling = sampling
+    _batch_float_format = float_format
+
+def generate_batch_scenario(file_name):
+    stats = road_generation.GenerationStats()
+    with open(file_name, "w") as file:
+        write_document(_batch_root, file, _batch_sampling, stats,
+            _batch_float_format)
+    return stats
+
+def generate_batch(root, sampling, count, jobs, out_dir,
+        float_format=writer.FLOAT_FORMAT, print_stats=False):
+    os.makedirs(out_dir, exist_ok=True)
+    file_names = [os.path.join(out_dir, "scenario-{0:05d}.xml".format(i))
+        for i in range(count)]
+
+    total_stats = road_generation.GenerationStats()
+    start = time.perf_counter()
+    with Pool(jobs, initializer=init_batch_worker,
+            initargs=(etree.tostring(root), sampling, float_format)) as pool:
+        for stats in tqdm(pool.imap_unordered(generate_batch_scenario, file_names),
+                total=count):
+            total_stats.add(stats)
+    duration = time.perf_counter() - start
+
+    print("Generated {0} scenarios in {1:.1f} s ({2:.2f} scenarios/s)".format(
+        count, duration, count / duration), file=sys.stderr)
+    if print_stats:
+        print(total_stats, file=sys.stderr)
 
 def ego_vehicle():
     shape = schema.shape()